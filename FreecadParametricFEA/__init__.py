@@ -1 +1,3 @@
 from .parametric import parametric, FreecadModel
+from .modelpool import FreecadModelPool
+from .dispatcher import Dispatcher, FreecadCmdDispatcher, SlurmDispatcher
@@ -0,0 +1,603 @@
+"""Dispatcher objects: run FEA test cases outside of the main process"""
+import os
+import sys
+import json
+import time
+import getpass
+import shutil
+import tempfile
+import threading
+import subprocess
+from zipfile import BadZipFile
+from concurrent.futures import Future, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .register_freecad import registered_freecad_path
+from .loghandler import logger
+
+
+def save_case_result(filename: str, result: dict) -> None:
+    """saves the results of a test case, as returned by a Dispatcher, to a
+    .npz file. The file only appears once it is complete
+
+    Args:
+        filename (str): path to the .npz file
+        result (dict): "outputs" (output_var: array), "runtime", "msg" and
+            "export_path" of the test case
+    """
+    arrays = {
+        f"output:{output_var}": np.asarray(values)
+        for (output_var, values) in result["outputs"].items()
+    }
+    arrays["runtime"] = np.asarray(result["runtime"])
+    arrays["msg"] = np.asarray(result["msg"])
+    arrays["export_path"] = np.asarray(result["export_path"])
+
+    partial_filename = f"{filename}.partial.npz"
+    np.savez(partial_filename, **arrays)
+    os.replace(partial_filename, filename)
+
+
+def load_case_result(filename: str) -> dict:
+    """loads the results of a test case saved by save_case_result()
+
+    Args:
+        filename (str): path to the .npz file
+
+    Returns:
+        dict: "outputs" (output_var: array), "runtime", "msg" and
+            "export_path" of the test case
+    """
+    with np.load(filename, allow_pickle=False) as arrays:
+        return {
+            "outputs": {
+                name[len("output:") :]: arrays[name]
+                for name in arrays.files
+                if name.startswith("output:")
+            },
+            "runtime": float(arrays["runtime"]),
+            "msg": str(arrays["msg"]),
+            "export_path": str(arrays["export_path"]),
+        }
+
+
+def _failed_result(msg: str) -> dict:
+    """results of a test case that produced no results"""
+    return {"outputs": {}, "runtime": 0.0, "msg": msg, "export_path": ""}
+
+
+def _json_value(value):
+    """converts numpy scalars to Python values for json.dump"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value)} is not JSON serialisable")
+
+
+class Dispatcher:
+    """Runs FEA test cases, each one described by a job tuple
+    (case_idx, parameters, solver_name, results_name, output_vars,
+    export_path, output_groups). Subclasses implement submit()"""
+
+    def submit(self, job: Tuple) -> Future:
+        """starts running a test case
+
+        Args:
+            job (tuple): (case_idx, parameters, solver_name, results_name,
+                output_vars, export_path, output_groups) as built by
+                imap_parameters()
+
+        Returns:
+            Future: resolves to (case_idx, result), result being a dictionary
+                with "outputs" (output_var: array), "runtime", "msg" and
+                "export_path", and optionally "reduced" (heading: value)
+        """
+        raise NotImplementedError
+
+    def map_parameters(
+        self,
+        param_tuples: Sequence[Sequence[Tuple[str, str, Any]]],
+        solver_name: str = "",
+        results_name: str = "",
+        output_vars: Sequence[str] = (),
+        export_paths: Optional[Sequence[str]] = None,
+        output_groups: Optional[Sequence[tuple]] = None,
+    ) -> List[dict]:
+        """runs one FEA per set of parameters
+
+        Args:
+            param_tuples (list): one entry per test case, each a list of
+                (object_name, constraint_name, target_value) tuples
+            solver_name (str, optional): name of the solver object. Found
+                automatically if not specified
+            results_name (str, optional): name of the results object. Found
+                automatically if not specified
+            output_vars (list of str, optional): results properties to return
+                (e.g. vonMises)
+            export_paths (list of str, optional): one .vtu path per test case
+                to export the results to. Defaults to no export
+            output_groups (list of tuple, optional): outputs to reduce where
+                the test cases run, as built by run_parametric(). Dispatchers
+                that can't reduce return the output_vars fields instead.
+                Defaults to returning the output_vars fields
+
+        Returns:
+            list of dict: for each test case, in the same order as
+                param_tuples, a dictionary with "outputs" (output_var: array),
+                "runtime", "msg" and "export_path", and "reduced" (heading:
+                value) if the outputs were reduced
+        """
+        results: List[dict] = [{}] * len(param_tuples)
+        for (case_idx, result) in self.imap_parameters(
+            param_tuples,
+            solver_name=solver_name,
+            results_name=results_name,
+            output_vars=output_vars,
+            export_paths=export_paths,
+            output_groups=output_groups,
+        ):
+            results[case_idx] = result
+
+        return results
+
+    def imap_parameters(
+        self,
+        param_tuples: Sequence[Sequence[Tuple[str, str, Any]]],
+        solver_name: str = "",
+        results_name: str = "",
+        output_vars: Sequence[str] = (),
+        export_paths: Optional[Sequence[str]] = None,
+        output_groups: Optional[Sequence[tuple]] = None,
+    ) -> Iterator[Tuple[int, dict]]:
+        """same as map_parameters(), but yields the test cases as soon as they
+        complete, in completion order
+
+        Yields:
+            (int, dict): the position of the test case in param_tuples, and
+                its results as returned by map_parameters()
+        """
+        futures = [
+            self.submit(job)
+            for job in self._jobs(
+                param_tuples,
+                solver_name,
+                results_name,
+                output_vars,
+                export_paths,
+                output_groups,
+            )
+        ]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+    def _jobs(
+        self,
+        param_tuples: Sequence[Sequence[Tuple[str, str, Any]]],
+        solver_name: str,
+        results_name: str,
+        output_vars: Sequence[str],
+        export_paths: Optional[Sequence[str]],
+        output_groups: Optional[Sequence[tuple]],
+    ) -> List[Tuple]:
+        """builds the job tuple of each test case, see map_parameters()"""
+        if export_paths is None:
+            export_paths = [""] * len(param_tuples)
+
+        return [
+            (
+                case_idx,
+                list(parameters),
+                solver_name,
+                results_name,
+                tuple(output_vars),
+                export_path,
+                output_groups,
+            )
+            for (case_idx, (parameters, export_path)) in enumerate(
+                zip(param_tuples, export_paths)
+            )
+        ]
+
+    def close(self) -> None:
+        """releases the resources of the dispatcher"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SlurmDispatcher(Dispatcher):
+    """Runs each test case as a separate job on a SLURM cluster. The staging
+    folder must be on a filesystem shared with the compute nodes"""
+
+    def __init__(
+        self,
+        document_path: str,
+        freecad_path: str = "",
+        staging_dir: str = "",
+        sbatch_options: Sequence[str] = (),
+        python_executable: str = "",
+        poll_interval: float = 10.0,
+    ) -> None:
+        """initialises a SlurmDispatcher object
+
+        Args:
+            document_path (str): path to the FreeCAD file
+            freecad_path (str): path to the FreeCAD Python libraries on the
+                compute nodes. Defaults to the path used by this process
+            staging_dir (str, optional): folder for the job files. Defaults to
+                a new folder in the current directory, removed by close()
+                unless a job ended without results
+            sbatch_options (list of str, optional): extra #SBATCH options,
+                e.g. ["--partition=short", "--time=00:30:00"]
+            python_executable (str, optional): Python interpreter running the
+                jobs, with FreecadParametricFEA installed. Defaults to the
+                interpreter of this process
+            poll_interval (float, optional): seconds between checks of the
+                job queue. Defaults to 10
+        """
+        self.filename = document_path
+        self.freecad_path = freecad_path or registered_freecad_path()
+        # the default folder is in the current directory rather than in /tmp,
+        # which usually isn't shared with the compute nodes
+        self._own_staging_dir = staging_dir == ""
+        self.staging_dir = staging_dir or tempfile.mkdtemp(
+            prefix="freecadparametricfea_slurm_", dir=os.getcwd()
+        )
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self.sbatch_options = list(sbatch_options)
+        self.python_executable = python_executable or sys.executable
+        self.poll_interval = poll_interval
+
+        # submitted jobs still running, by SLURM job id: (future, case_idx,
+        # job folder)
+        self._running: Dict[str, Tuple[Future, int, str]] = {}
+        self._lock = threading.Lock()
+        # polls the queue while jobs are running. Started and stopped under
+        # self._lock, so that no job is registered after it decided to stop
+        self._poller: Optional[threading.Thread] = None
+        # the job folders are kept to inspect the jobs that failed
+        self._keep_staging_dir = False
+
+    def submit(self, job: Tuple) -> Future:
+        """writes the job files of a test case and submits it with sbatch,
+        see Dispatcher.submit(). The reduction functions can't be written to
+        the job files: the jobs always return the output_vars fields"""
+        (
+            case_idx,
+            parameters,
+            solver_name,
+            results_name,
+            output_vars,
+            export_path,
+            _,
+        ) = job
+
+        job_dir = tempfile.mkdtemp(prefix=f"case_{case_idx}_", dir=self.staging_dir)
+        local_document = os.path.join(job_dir, os.path.basename(self.filename))
+        shutil.copyfile(self.filename, local_document)
+
+        params_file = os.path.join(job_dir, "params.json")
+        with open(params_file, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "document_path": local_document,
+                    "freecad_path": self.freecad_path,
+                    "case_idx": case_idx,
+                    "parameters": [list(p) for p in parameters],
+                    "solver_name": solver_name,
+                    "results_name": results_name,
+                    "output_vars": list(output_vars),
+                    "export_path": export_path,
+                    "results_path": os.path.join(job_dir, "results.npz"),
+                },
+                f,
+                default=_json_value,
+            )
+
+        script_file = os.path.join(job_dir, "job.sh")
+        with open(script_file, "w", encoding="utf8") as f:
+            f.write("#!/bin/bash\n")
+            f.write(f"#SBATCH --job-name=freecadparametricfea_{case_idx}\n")
+            f.write(f"#SBATCH --output={os.path.join(job_dir, 'slurm.out')}\n")
+            for option in self.sbatch_options:
+                f.write(f"#SBATCH {option}\n")
+            f.write(
+                f'"{self.python_executable}" -m FreecadParametricFEA.worker '
+                f'"{params_file}"\n'
+            )
+
+        try:
+            submitted = subprocess.run(
+                ["sbatch", "--parsable", script_file],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            msg = f"Could not submit test case {case_idx} to SLURM: {e}"
+            logger.error(msg)
+            raise RuntimeError(msg) from e
+
+        job_id = submitted.stdout.strip().split(";")[0]
+        logger.debug("Test case %s submitted as SLURM job %s", case_idx, job_id)
+
+        future: Future = Future()
+        with self._lock:
+            self._running[job_id] = (future, case_idx, job_dir)
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, daemon=True)
+                self._poller.start()
+
+        return future
+
+    def close(self) -> None:
+        """cancels the jobs still running, and removes the default staging
+        folder"""
+        with self._lock:
+            job_ids = list(self._running)
+
+        if job_ids:
+            subprocess.run(["scancel", *job_ids], check=False)
+
+        if self._own_staging_dir and os.path.isdir(self.staging_dir):
+            if self._keep_staging_dir:
+                logger.info("SLURM job files kept in %s", self.staging_dir)
+            else:
+                shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def _poll(self) -> None:
+        """completes the futures of the jobs that left the queue, until no
+        jobs are running"""
+        while True:
+            time.sleep(self.poll_interval)
+
+            with self._lock:
+                if not self._running:
+                    self._poller = None
+                    return
+                running = dict(self._running)
+
+            try:
+                self._complete_jobs(running)
+            except Exception as e:
+                # the pending futures would otherwise never complete, and the
+                # sweep would wait for them forever
+                msg = f"Stopped polling the SLURM jobs: {e}"
+                logger.error(msg)
+                with self._lock:
+                    pending = list(self._running.values())
+                    self._running.clear()
+                    self._poller = None
+                for (future, _, _) in pending:
+                    future.set_exception(RuntimeError(msg))
+                return
+
+    def _complete_jobs(self, running: Dict[str, Tuple[Future, int, str]]) -> None:
+        """completes the futures of the jobs that left the queue
+
+        Args:
+            running (dict): (future, case_idx, job folder) of the jobs still
+                running, by SLURM job id
+        """
+        queued = self._queued_job_ids()
+        for (job_id, (future, case_idx, job_dir)) in running.items():
+            results_path = os.path.join(job_dir, "results.npz")
+            if os.path.isfile(results_path):
+                try:
+                    result = load_case_result(results_path)
+                except (OSError, EOFError, ValueError, KeyError, BadZipFile) as e:
+                    result = _failed_result(
+                        f"Could not read the results of SLURM job {job_id}: {e}"
+                    )
+                    self._keep_staging_dir = True
+                    logger.warning(
+                        "Could not read the results of SLURM job %s: %s", job_id, e
+                    )
+            elif queued is None or job_id in queued:
+                continue
+            else:
+                result = _failed_result(f"SLURM job {job_id} ended without results")
+                self._keep_staging_dir = True
+                logger.warning(
+                    "SLURM job %s ended without results, see %s",
+                    job_id,
+                    os.path.join(job_dir, "slurm.out"),
+                )
+
+            with self._lock:
+                del self._running[job_id]
+            future.set_result((case_idx, result))
+
+    def _queued_job_ids(self) -> Optional[set]:
+        """lists the SLURM jobs of the current user still pending or running
+
+        Returns:
+            set of str: job ids, or None if the queue could not be read
+        """
+        try:
+            queue = subprocess.run(
+                ["squeue", "-h", "-o", "%i", "-u", getpass.getuser()],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning("Could not read the SLURM queue: %s", e)
+            return None
+
+        return set(queue.stdout.split())
+
+
+class FreecadCmdDispatcher(Dispatcher):
+    """Runs all the test cases of a sweep in a single freecadcmd process, which
+    starts FreeCAD and opens the document only once. FreecadParametricFEA and
+    its dependencies must be importable from FreeCAD's Python"""
+
+    def __init__(
+        self,
+        document_path: str,
+        freecadcmd: str = "freecadcmd",
+        staging_dir: str = "",
+        poll_interval: float = 0.5,
+    ) -> None:
+        """initialises a FreecadCmdDispatcher object
+
+        Args:
+            document_path (str): path to the FreeCAD file
+            freecadcmd (str, optional): FreeCAD command line executable, e.g.
+                "C:/Program Files/FreeCAD 0.20/bin/FreeCADCmd.exe". Defaults
+                to freecadcmd on the PATH
+            staging_dir (str, optional): folder for the job and solver files.
+                Defaults to a temporary folder, removed by close()
+            poll_interval (float, optional): seconds between checks for
+                completed test cases. Defaults to 0.5
+        """
+        self.filename = os.path.abspath(document_path)
+        self.freecadcmd = freecadcmd
+        self._own_staging_dir = staging_dir == ""
+        self.staging_dir = staging_dir or tempfile.mkdtemp(
+            prefix="freecadparametricfea_freecadcmd_"
+        )
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self.poll_interval = poll_interval
+
+    def close(self) -> None:
+        """removes the default staging folder, with the job and solver files"""
+        if self._own_staging_dir and os.path.isdir(self.staging_dir):
+            shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def submit(self, job: Tuple) -> Future:
+        """runs a single test case in its own freecadcmd process, see
+        Dispatcher.submit()"""
+        future: Future = Future()
+        for result in self._run_batch([job]):
+            future.set_result(result)
+        return future
+
+    def imap_parameters(
+        self,
+        param_tuples: Sequence[Sequence[Tuple[str, str, Any]]],
+        solver_name: str = "",
+        results_name: str = "",
+        output_vars: Sequence[str] = (),
+        export_paths: Optional[Sequence[str]] = None,
+        output_groups: Optional[Sequence[tuple]] = None,
+    ) -> Iterator[Tuple[int, dict]]:
+        """runs all the test cases in one freecadcmd process, see
+        Dispatcher.imap_parameters(). The reduction functions can't be written
+        to the job file: the fields in output_vars are always returned"""
+        yield from self._run_batch(
+            self._jobs(
+                param_tuples,
+                solver_name,
+                results_name,
+                output_vars,
+                export_paths,
+                output_groups,
+            )
+        )
+
+    def _run_batch(self, jobs: List[Tuple]) -> Iterator[Tuple[int, dict]]:
+        """runs a batch of test cases in one freecadcmd process
+
+        Args:
+            jobs (list of tuple): job tuples, see Dispatcher.submit()
+
+        Yields:
+            (int, dict): the index of each test case and its results, in
+                completion order
+        """
+        batch_dir = tempfile.mkdtemp(prefix="batch_", dir=self.staging_dir)
+        results_paths = {}
+        cases = []
+        for (
+            case_idx,
+            parameters,
+            solver_name,
+            results_name,
+            output_vars,
+            export_path,
+            _,
+        ) in jobs:
+            results_paths[case_idx] = os.path.join(batch_dir, f"results_{case_idx}.npz")
+            cases.append(
+                {
+                    "case_idx": case_idx,
+                    "parameters": [list(p) for p in parameters],
+                    "solver_name": solver_name,
+                    "results_name": results_name,
+                    "output_vars": list(output_vars),
+                    "export_path": export_path,
+                    "results_path": results_paths[case_idx],
+                }
+            )
+
+        params_file = os.path.join(batch_dir, "params.json")
+        with open(params_file, "w", encoding="utf8") as f:
+            json.dump(
+                {
+                    "document_path": self.filename,
+                    # FreeCAD is already loaded in freecadcmd
+                    "freecad_path": "",
+                    "cases": cases,
+                },
+                f,
+                default=_json_value,
+            )
+
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        command = (
+            f"import sys; sys.path.insert(0, {package_dir!r}); "
+            "from FreecadParametricFEA.worker import run_job; "
+            f"run_job({params_file!r})"
+        )
+
+        log_file = os.path.join(batch_dir, "freecadcmd.log")
+        try:
+            with open(log_file, "w", encoding="utf8") as log:
+                process = subprocess.Popen(
+                    [self.freecadcmd, "-c", command],
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+        except OSError as e:
+            msg = f"Could not start {self.freecadcmd}: {e}"
+            logger.error(msg)
+            raise RuntimeError(msg) from e
+        logger.debug("Running %d test cases in freecadcmd", len(cases))
+
+        try:
+            while results_paths:
+                # checked before the results, so that all the results written
+                # before the process exited are collected
+                exited = process.poll() is not None
+                for (case_idx, results_path) in list(results_paths.items()):
+                    if os.path.isfile(results_path):
+                        del results_paths[case_idx]
+                        yield (case_idx, load_case_result(results_path))
+
+                if exited:
+                    break
+                time.sleep(self.poll_interval)
+
+            for case_idx in results_paths:
+                logger.warning(
+                    "freecadcmd exited without running test case %s, see %s",
+                    case_idx,
+                    log_file,
+                )
+                yield (
+                    case_idx,
+                    _failed_result(
+                        f"freecadcmd exited with code {process.returncode} "
+                        "without results"
+                    ),
+                )
+        finally:
+            if process.poll() is None:
+                process.kill()
@@ -1,37 +1,292 @@
 """FreecadModel object and helpers"""
 import os
+import sys
+import logging
+import hashlib
 import contextlib
-from .loghandler import logger
+from functools import lru_cache, partial
+
+import numpy as np
 
-from .register_freecad import register_freecad
+from .loghandler import logger
 
-from typing import Tuple
+from .register_freecad import (
+    register_freecad,
+    get_femtools,
+    get_vtk_results,
+    get_import_materials,
+)
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# placeholder for a parameter that hasn't been set yet
+_UNSET = object()
+
+
+def order_statistics(values: np.ndarray, quantiles: Sequence[float]) -> list:
+    """computes the min (0), median (0.5) and max (1) quantiles of an array
+    with a single np.partition, rather than one pass each. The values are the
+    same as given by np.min, np.median and np.max
+
+    Args:
+        values (np.ndarray): values of a results field
+        quantiles (list of float): 0, 0.5 or 1 each
+
+    Raises:
+        ValueError: if the array is empty
+
+    Returns:
+        list: the value of each quantile, in the same order
+    """
+    flat = values.ravel()
+    n = flat.size
+    if n == 0:
+        raise ValueError("Order statistics of an empty results field")
+
+    # both middle values, as np.median averages them when n is even
+    middle = slice((n - 1) // 2, n // 2 + 1)
+    part = np.partition(flat, sorted({0, middle.start, middle.stop - 1, n - 1}))
+    # NaNs are partitioned last, and make all the order statistics NaN
+    if np.isnan(part[n - 1]):
+        return [part[n - 1]] * len(quantiles)
+
+    stats = {0.0: part[0], 0.5: np.mean(part[middle]), 1.0: part[n - 1]}
+    return [stats[q] for q in quantiles]
+
+
+def reduce_results(get_values: Callable, output_groups: Sequence[tuple]) -> dict:
+    """applies the reduction functions of a set of outputs to FEA results
+
+    Args:
+        get_values (function handle): returns the values of a results field
+            (e.g. vonMises), given its name
+        output_groups (list of tuple): the outputs grouped by results field,
+            as (output_var, [(quantile, heading), ...],
+            [(reduction_fun, heading), ...])
+
+    Returns:
+        dict: the reduced value of each output, by dataframe heading
+    """
+    reduced = {}
+    # each results field is fetched and converted to an array only once,
+    # then all the outputs of that field reduce the same array
+    for (output_var, quantiles, reductions) in output_groups:
+        values = np.asarray(get_values(output_var))
+        if quantiles:
+            quantile_values = order_statistics(values, [q for (q, _) in quantiles])
+            for ((_, heading), value) in zip(quantiles, quantile_values):
+                reduced[heading] = value
+        for (reduction_fun, heading) in reductions:
+            reduced[heading] = reduction_fun(values)
+
+    return reduced
+
+
+def file_digest(filename: str) -> str:
+    """hashes the contents of a file, so that cached results are tied to the
+    model they were computed with, and invalidated when it is saved with
+    changes
+
+    Args:
+        filename (str): path to the file
+
+    Returns:
+        str: SHA-256 digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _index_constraints(sketch) -> Dict[str, int]:
+    """maps the names of the named constraints of a sketch to their index"""
+    return {c.Name: i for (i, c) in enumerate(sketch.Constraints) if c.Name}
+
+
+def _set_sketch_constraint(
+    constraint_index: Dict[str, int], target, constraint_name: str, target_value
+):
+    """sets a named constraint of a sketch (e.g. a dimension)
+
+    Args:
+        constraint_index (dict): constraint indices by name, as built by
+            _index_constraints()
+
+    Raises:
+        NameError: if the sketch has no constraint with that name
+    """
+    try:
+        constraint_idx = constraint_index[constraint_name]
+    except KeyError:
+        raise NameError(f"Constraint {constraint_name} not found") from None
+
+    # sketcher objects need obj.setDatum, by index to skip the name search
+    target.setDatum(constraint_idx, target_value)
+
+
+def _bind_setter(setter: Callable, target, constraint_name: str) -> Callable:
+    """binds a parameter setter to its target and constraint, so that only the
+    value is left to pass. Sketch constraints are resolved to their index here
+
+    Raises:
+        NameError: if the sketch has no constraint with that name
+    """
+    if isinstance(setter, partial) and setter.func is _set_sketch_constraint:
+        (constraint_index,) = setter.args
+        try:
+            return partial(target.setDatum, constraint_index[constraint_name])
+        except KeyError:
+            raise NameError(f"Constraint {constraint_name} not found") from None
+    return partial(setter, target, constraint_name)
+
+
+@lru_cache(maxsize=32)
+def _materials_for(category: str) -> dict:
+    """reads the material cards of a category. The cards are parsed from disk,
+    so the result is cached
+
+    Args:
+        category (str): material category (e.g. Solid)
+
+    Returns:
+        dict: material cards, by file path
+    """
+    materials, _, _ = get_import_materials()(category)
+    return materials
+
+
+def _set_material(target, constraint_name: str, target_value: str):
+    """sets the material of a material object, via its material card name"""
+    # materials need some special treatment via material cards
+    materials = _materials_for(target.Category)
+
+    m = next((m for m in materials.values() if m["CardName"] == target_value), None)
+    if m is not None:
+        # the card is shared by all the calls: give FreeCAD its own copy
+        target.Material = dict(m)
+        return
+
+    logger.debug("Material %s not found in %s", target_value, target.Category)
+
+
+def _set_property(target, constraint_name: str, target_value):
+    """sets a property of a generic object"""
+    # generic objects need setattr(obj, attr, value)
+    getattr(target, constraint_name)
+    setattr(target, constraint_name, target_value)
+
+
+# per-node fields of a FreeCAD mechanical results object written to VTK files
+_RESULT_FIELDS = (
+    "DisplacementVectors",
+    "DisplacementLengths",
+    "vonMises",
+    "PrincipalMax",
+    "PrincipalMed",
+    "PrincipalMin",
+    "MaxShear",
+    "PS1Vector",
+    "PS2Vector",
+    "PS3Vector",
+    "Temperature",
+    "MassFlowRate",
+    "NetworkPressure",
+    "UserDefined",
+    "Peeq",
+    "NodeStressXX",
+    "NodeStressYY",
+    "NodeStressZZ",
+    "NodeStressXY",
+    "NodeStressXZ",
+    "NodeStressYZ",
+    "NodeStrainXX",
+    "NodeStrainYY",
+    "NodeStrainZZ",
+    "NodeStrainXY",
+    "NodeStrainXZ",
+    "NodeStrainYZ",
+)
+
+# how to set a parameter, by object TypeId. Other objects use _set_property
+_PARAMETER_SETTERS: Dict[str, Callable[[Any, str, Any], None]] = {
+    "Sketcher::SketchObject": _set_sketch_constraint,
+    "App::MaterialObjectPython": _set_material,
+}
 
 
 class FreecadModel:
     """FreecadModel class"""
 
-    def __init__(self, document_path: str, freecad_path: str = "") -> None:
+    def __init__(
+        self,
+        document_path: str,
+        freecad_path: str = "",
+        cache_dir: str = "",
+        working_dir: str = "",
+    ) -> None:
         """initialises a FreecadModel object
 
         Args:
             document_path (str): path to the FreeCAD file
             freecad_path (str): path to the FreeCAD Python libraries
+            cache_dir (str, optional): folder where FEA results are stored,
+                keyed by the parameters they were computed with, and reused
+                instead of re-running the solver. Defaults to no disk cache
+            working_dir (str, optional): folder where the solver writes its
+                input and results files. Defaults to the FreeCAD preferences
         """
         self.filename = document_path
+        self.cache_dir = cache_dir
+        self.working_dir = working_dir
 
-        global FreeCAD, femtools, vtkResults
-        (FreeCAD, femtools, vtkResults) = register_freecad(freecad_path=freecad_path)
+        global FreeCAD
+        FreeCAD = register_freecad(freecad_path=freecad_path)
 
         self.model = FreeCAD.open(document_path)
-        logger.debug(f"Opened FreeCAD model {document_path}")
+        logger.debug("Opened FreeCAD model %s", document_path)
 
         self.solver_name = ""
         self.fea_results_name = ""
+        # threads used by CalculiX. 0 keeps the FreeCAD preferences
+        self.ccx_threads = 0
+
+        # document objects resolved by name or label, reused across a sweep
+        self._obj_cache: Dict[Tuple[str, str], Any] = {}
+        # constraint indices by name, for each sketch by id()
+        self._constraint_index: Dict[int, Dict[str, int]] = {}
+        # objects changed with defer_recompute, waiting for commit_parameters()
+        self._dirty_objects: List[Any] = []
+
+        # parameter values applied so far, used to identify FEA results
+        self._param_state: Dict[Tuple[str, str], Any] = {}
+        # parameters of the results currently in the document
+        self._solved_key = ""
+        # digest of the document file, computed on first use
+        self._document_digest = ""
+        # name of the results object returned by the last run_fea()
+        self._results_object_name = ""
+        # solver tools, kept across runs of the same solver
+        self._fea = None
+        self._fea_solver_name = ""
+
+        # opened once, used to silence the solver on every run
+        self._devnull = open(os.devnull, "w", encoding="utf8")
         # TODO: error handling
 
+    def __del__(self):
+        devnull = getattr(self, "_devnull", None)
+        if devnull is not None:
+            devnull.close()
+
     def change_parameter(
-        self, object_name: str, constraint_name: str, target_value: float
+        self,
+        object_name: str,
+        constraint_name: str,
+        target_value: float,
+        defer_recompute: bool = False,
     ):
         """changes a parameter (e.g. a named constraint) inside a freecad
         document. Currently works if the constraint is inside the driving
@@ -42,71 +297,131 @@ class FreecadModel:
                 sketch containing the constraint
             constraint_name (str): name of the constraint to modify
             target_value (float): target value for the constraint
+            defer_recompute (bool, optional): if True, the model is not
+                recomputed until commit_parameters() (or run_fea()) is called.
+                Useful when changing several parameters at once.
+                Defaults to False.
         """
+        self.stage_parameter(object_name, constraint_name, target_value)
 
-        target_object = self.model.getObjectsByLabel(object_name)
-        if not target_object:
-            try:
-                raise KeyError(f"Unable to find object {object_name} in the model")
-            except KeyError as e:
-                logger.exception(str(e))
-                raise
+        if not defer_recompute:
+            self.commit_parameters()
+
+    def stage_parameter(
+        self, object_name: str, constraint_name: str, target_value: float
+    ):
+        """changes a parameter without recomputing the model: call
+        commit_parameters() (or run_fea()) once all parameters are staged.
+        Parameters already set to the same value are left untouched
 
-        # supported specific object types:
-        # <Sketcher::SketchObject>
-        # <App::MaterialObjectPython object>
+        Args:
+            object_name (str): name of the Freecad object containing the
+                sketch containing the constraint
+            constraint_name (str): name of the constraint to modify
+            target_value (float): target value for the constraint
+        """
 
-        # FIXME: this should really be done via type checking
+        # names often come from user data (e.g. dataframe columns): interning
+        # makes the cache lookups below compare them by identity
+        object_name = sys.intern(str(object_name))
+        constraint_name = sys.intern(str(constraint_name))
 
-        try:
-            target_str = str(target_object[0])
+        # the model already has this value: nothing to change
+        if (
+            self._param_state.get((object_name, constraint_name), _UNSET)
+            == target_value
+        ):
+            return
 
-            # sketcher objects need obj.getDatum / obj.setDatum
-            if target_str == "<Sketcher::SketchObject>":
-                target_object[0].getDatum(constraint_name)
-                logger.debug(
-                    f"Object {object_name} is a sketch, found {constraint_name}"
-                )
+        (target, setter) = self._resolve_target(object_name)
 
-                target_object[0].setDatum(constraint_name, target_value)
+        try:
+            setter(target, constraint_name, target_value)
 
-            # materials need some special treatment via material cards
-            elif target_str == "<App::MaterialObjectPython object>":
-                from materialtools.cardutils import import_materials as getmats  # type: ignore
+        except (NameError, IndexError):
+            logger.exception(
+                "Invalid constraint name %s in object %s", constraint_name, object_name
+            )
+            raise
+        except ValueError:
+            # the parameter may or may not have been changed
+            self._param_state.pop((object_name, constraint_name), None)
+            raise
 
-                materials, _, _ = getmats(target_object[0].Category)
+        self._param_state[(object_name, constraint_name)] = target_value
+        logger.debug("Set %s.%s to %s", object_name, constraint_name, target_value)
+        if target not in self._dirty_objects:
+            self._dirty_objects.append(target)
 
-                for (_, m) in materials.items():
-                    if m["CardName"] == target_value:
-                        target_object[0].Material = m
-                        return
+    def parameter_setter(
+        self, object_name: str, constraint_name: str
+    ) -> Callable[[Any], None]:
+        """resolves a parameter once, and returns a function that stages a new
+        value for it (see stage_parameter()). Meant for sweeps changing the
+        same parameters many times
 
-                logger.debug(
-                    f"Object {object_name} is a material, "
-                    "setting material {constraint_value}"
-                )
+        Args:
+            object_name (str): name of the Freecad object containing the
+                sketch containing the constraint
+            constraint_name (str): name of the constraint to modify
 
-            # generic objects need setattr(obj, attr, value)
-            else:
-                getattr(target_object[0], constraint_name)
-                logger.debug(
-                    f"Object {object_name} is an object, found {constraint_name}"
-                )
+        Returns:
+            function handle: stages the value passed to it
 
-                setattr(target_object[0], constraint_name, target_value)
+        Raises:
+            NameError: if the constraint doesn't exist
+        """
+        object_name = sys.intern(str(object_name))
+        constraint_name = sys.intern(str(constraint_name))
 
-        except (NameError, IndexError):
+        (target, setter) = self._resolve_target(object_name)
+        try:
+            set_value = _bind_setter(setter, target, constraint_name)
+        except NameError:
             logger.exception(
-                f"Invalid constraint name {constraint_name} in object {object_name}"
+                "Invalid constraint name %s in object %s", constraint_name, object_name
             )
             raise
 
-        logger.debug(f"Set {object_name}.{constraint_name} to {target_value}")
-        # apply changes and recompute
+        key = (object_name, constraint_name)
+        param_state = self._param_state
+        dirty_objects = self._dirty_objects
+
+        def stage(target_value):
+            # the model already has this value: nothing to change
+            if param_state.get(key, _UNSET) == target_value:
+                return
+
+            try:
+                set_value(target_value)
+            except ValueError:
+                # the parameter may or may not have been changed
+                param_state.pop(key, None)
+                raise
+
+            param_state[key] = target_value
+            if target not in dirty_objects:
+                dirty_objects.append(target)
+
+        return stage
+
+    def commit_parameters(self):
+        """applies the parameters changed so far by recomputing the model once"""
+        if not self._dirty_objects:
+            return
+
+        # touching makes sure the changed objects and everything depending on
+        # them are part of the recompute
+        for obj in self._dirty_objects:
+            obj.touch()
+        self._dirty_objects.clear()
+
         self.model.recompute()
         logger.debug("Model recomputed")
         # TODO: check for model errors here
 
+    commit = commit_parameters
+
     def run_fea(self):
         """runs a FEA analysis in the specified freecad document
 
@@ -119,61 +434,303 @@ class FreecadModel:
             fea object: a FreeCAD object containing the FEA results
         """
 
+        self.commit_parameters()
+
         if self.solver_name == "":
             self._find_solver_result_names()
 
-        solver_object = self.model.getObject(self.solver_name)
+        key = self._results_key()
+
+        # the results in the document were computed with these parameters
+        if key == self._solved_key and self._get_object(self._results_object_name):
+            logger.debug("FEA results already available, skipping the solver")
+            return self._get_object(self._results_object_name)
+
+        cache_file = ""
+        if self.cache_dir != "":
+            cache_file = os.path.join(self.cache_dir, f"{key}.vtu")
+            if os.path.isfile(cache_file):
+                return self._load_cached_results(key, cache_file)
+
+        self._solved_key = ""
+
+        # setting up the solver tools scans the whole analysis: only done once
+        if self._fea is None or self._fea_solver_name != self.solver_name:
+            solver_object = self._get_object(self.solver_name)
+            self._fea = get_femtools().ccxtools.FemToolsCcx(solver=solver_object)
+            self._fea_solver_name = self.solver_name
+            if self.working_dir != "":
+                self._fea.setup_working_dir(self.working_dir, create=True)
+            self._fea.purge_results()
+            self._fea.reset_all()
+        else:
+            # the binary and working directory checks done by reset_all()
+            # still hold: only the previous results need clearing
+            self._fea.purge_results()
+            self._fea.results_present = False
 
-        fea = femtools.ccxtools.FemToolsCcx(solver=solver_object)
-        fea.purge_results()
-        fea.reset_all()
+        fea = self._fea
         fea.update_objects()
-        logger.debug(f"Prepared solver {solver_object.Name}")
+        logger.debug("Prepared solver %s", self.solver_name)
 
         # there should be some error handling here
         fea.check_prerequisites()
         logger.debug("Checked FEA prerequisites")
         # patching this because Calculix prints some useless info in
         # Freecad 0.20 for solid models only... see bug #3
-        with open(os.devnull, "w", encoding="utf8") as devnull:
-            with contextlib.redirect_stdout(devnull):
-                fea.run()
+        with self._mute_stdout(), self._solver_threads():
+            fea.run()
+
+        # the solver replaces the results object on every run
+        self._obj_cache.pop(("name", self.fea_results_name), None)
 
         if fea.results_present:
             logger.debug("FEA results generated")
-            return self.model.getObject(self.fea_results_name)
-        else:
-            try:
-                raise RuntimeError("FEA results are not present")
-            except RuntimeError as e:
-                logger.exception(str(e))
-                raise
+            self._solved_key = key
+            self._results_object_name = self.fea_results_name
+
+            if cache_file != "":
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self.export_fea_results(filename=cache_file, export_format="vtk")
 
-    def export_fea_results(self, filename: str, export_format: str = "vtk"):
+            return self._get_object(self.fea_results_name)
+        else:
+            msg = "FEA results are not present"
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+    def export_fea_results(
+        self,
+        filename: str,
+        export_format: str = "vtk",
+        fields: Optional[Sequence[str]] = None,
+    ):
         """exports the results of a analysis to various mesh formats
 
         Args:
             filename (str): path to the output file
             export_format (str, optional): output format. Defaults to "vtk".
+            fields (list of str, optional): results fields to export (e.g.
+                ["vonMises", "DisplacementVectors"]). Defaults to all fields
 
         Raises:
             NotImplementedError: if the output format specified is not available
         """
 
         if export_format == "vtk":
-            objects = []
-            objects.append(self.model.getObject(self.fea_results_name))
-            vtkResults.importVTKResults.export(objects, filename)
-            logger.info(f"Exporting VTK file {filename}")
-            del objects
+            results = self._get_object(
+                self._results_object_name or self.fea_results_name
+            )
+            vtk_export = get_vtk_results().importVTKResults.export
+
+            if fields is None:
+                vtk_export((results,), filename)
+            else:
+                # export a copy of the results with the other fields emptied:
+                # the writer skips fields that have no values
+                subset = self.model.copyObject(results, False)
+                try:
+                    for field in _RESULT_FIELDS:
+                        if field not in fields and hasattr(subset, field):
+                            setattr(subset, field, [])
+                    vtk_export((subset,), filename)
+                finally:
+                    self.model.removeObject(subset.Name)
+
+            logger.info("Exporting VTK file %s", filename)
         else:
-            try:
-                raise NotImplementedError(
-                    f"Export method {export_format} not available"
+            msg = f"Export method {export_format} not available"
+            logger.error(msg)
+            raise NotImplementedError(msg)
+
+    @contextlib.contextmanager
+    def _mute_stdout(self):
+        """redirects stdout to os.devnull, both for Python code and for the
+        output written directly to the stdout file descriptor
+        """
+        sys.stdout.flush()
+        try:
+            stdout_fd = sys.__stdout__.fileno()
+        except (AttributeError, ValueError, OSError):
+            # no real stdout to redirect (e.g. pythonw)
+            stdout_fd = -1
+
+        saved_fd = os.dup(stdout_fd) if stdout_fd >= 0 else -1
+        if saved_fd >= 0:
+            os.dup2(self._devnull.fileno(), stdout_fd)
+        try:
+            with contextlib.redirect_stdout(self._devnull):
+                yield
+        finally:
+            if saved_fd >= 0:
+                os.dup2(saved_fd, stdout_fd)
+                os.close(saved_fd)
+
+    @contextlib.contextmanager
+    def _solver_threads(self):
+        """sets the number of threads of the CalculiX solver to ccx_threads,
+        both in the FreeCAD preferences and in the environment inherited by
+        the solver process, and restores them afterwards
+        """
+        if self.ccx_threads <= 0:
+            yield
+            return
+
+        prefs = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Fem/Ccx")
+        saved_pref = prefs.GetInt("AnalysisNumCPUs", 1)
+        env_vars = ("OMP_NUM_THREADS", "CCX_NPROC_EQUATION_SOLVER")
+        saved_env = {var: os.environ.get(var) for var in env_vars}
+
+        prefs.SetInt("AnalysisNumCPUs", self.ccx_threads)
+        for var in env_vars:
+            os.environ[var] = str(self.ccx_threads)
+        try:
+            yield
+        finally:
+            prefs.SetInt("AnalysisNumCPUs", saved_pref)
+            for (var, value) in saved_env.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+
+    def _results_key(self) -> str:
+        """builds a key identifying the FEA results for the current document,
+        solver and parameter values
+
+        Returns:
+            str: a hex digest of the document contents, solver names and
+                parameter values
+        """
+        if self._document_digest == "":
+            self._document_digest = file_digest(self.filename)
+
+        state = sorted(
+            (name, value.item() if hasattr(value, "item") else value)
+            for (name, value) in self._param_state.items()
+        )
+        return hashlib.blake2b(
+            repr(
+                (self._document_digest, self.solver_name, self.fea_results_name, state)
+            ).encode(),
+            digest_size=16,
+        ).hexdigest()
+
+    def _load_cached_results(self, key: str, cache_file: str):
+        """loads FEA results previously exported to the cache folder
+
+        Args:
+            key (str): key of the results, as built by _results_key()
+            cache_file (str): path to the cached .vtu file
+
+        Returns:
+            fea object: a FreeCAD object containing the FEA results
+        """
+        # only keep one set of cached results in the document at a time
+        previous = self._get_object(self._results_object_name)
+        is_imported = self._results_object_name != self.fea_results_name
+        if previous is not None and is_imported:
+            mesh = getattr(previous, "Mesh", None)
+            self.model.removeObject(previous.Name)
+            if mesh is not None:
+                self.model.removeObject(mesh.Name)
+            self._obj_cache.pop(("name", self._results_object_name), None)
+
+        # the importer adds the results to the active document without
+        # returning them: they are the new object holding results fields
+        FreeCAD.setActiveDocument(self.model.Name)
+        existing = {obj.Name for obj in self.model.Objects}
+        get_vtk_results().importVTKResults.importVtkFCResult(
+            cache_file, "CachedResults"
+        )
+        imported = [
+            obj
+            for obj in self.model.Objects
+            if obj.Name not in existing and hasattr(obj, "vonMises")
+        ]
+        if not imported:
+            msg = f"No FEA results found in cached file {cache_file}"
+            logger.error(msg)
+            raise RuntimeError(msg)
+
+        results = imported[0]
+        logger.debug("Loaded cached FEA results %s", cache_file)
+
+        self._solved_key = key
+        self._results_object_name = results.Name
+        return results
+
+    def invalidate_cache(self):
+        """forgets all the document objects and sketch constraints resolved so
+        far. Needed only if objects or constraints are added, removed or
+        renamed in the document outside of this class
+        """
+        self._obj_cache.clear()
+        self._constraint_index.clear()
+        self._fea = None
+
+    def _get_object(self, name: str):
+        """returns the document object with the given internal name, caching
+        the lookup
+
+        Args:
+            name (str): internal name of the object (e.g. SolverCcxTools)
+        """
+        key = ("name", name)
+        obj = self._obj_cache.get(key)
+        if obj is None:
+            obj = self.model.getObject(name)
+            if obj is not None:
+                self._obj_cache[key] = obj
+        return obj
+
+    def _get_by_label(self, label: str) -> list:
+        """returns the document objects with the given label, caching the
+        lookup
+
+        Args:
+            label (str): label of the object, as shown in the FreeCAD tree
+        """
+        key = ("label", label)
+        objs = self._obj_cache.get(key)
+        if objs is None:
+            objs = self.model.getObjectsByLabel(label)
+            if objs:
+                self._obj_cache[key] = objs
+        return objs
+
+    def _resolve_target(self, object_name: str) -> Tuple[Any, Callable]:
+        """finds the object referenced by a parameter and the function used to
+        change its parameters, caching both so that a sweep only resolves
+        each object once
+
+        Args:
+            object_name (str): label of the Freecad object
+
+        Raises:
+            KeyError: if no object with that label exists in the model
+        """
+        key = ("target", object_name)
+        target = self._obj_cache.get(key)
+        if target is None:
+            target_object = self._get_by_label(object_name)
+            if not target_object:
+                msg = f"Unable to find object {object_name} in the model"
+                logger.error(msg)
+                raise KeyError(msg)
+
+            setter = _PARAMETER_SETTERS.get(target_object[0].TypeId, _set_property)
+            if setter is _set_sketch_constraint:
+                constraint_index = self._constraint_index.setdefault(
+                    id(target_object[0]), _index_constraints(target_object[0])
                 )
-            except NotImplementedError as e:
-                logger.exception(str(e))
-                raise
+                setter = partial(_set_sketch_constraint, constraint_index)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Object %s is a %s", object_name, target_object[0].TypeId)
+
+            target = (target_object[0], setter)
+            self._obj_cache[key] = target
+        return target
 
     def _find_solver_result_names(self) -> Tuple[str, str]:
         # do stuff...
@@ -181,23 +738,29 @@ class FreecadModel:
         fea_results_name = ""
 
         for el in self.model.Objects:
-            if str(el) == "<Fem::FemSolverObjectPython object>":
+            type_id = el.TypeId
+            if type_id == "Fem::FemSolverObjectPython" and not solver_name:
                 solver_name = el.Name
-            if str(el) == "<Fem::FemResultObjectPython object>":
+            elif type_id == "Fem::FemResultObjectPython" and not fea_results_name:
                 fea_results_name = el.Name
 
+            if solver_name and fea_results_name:
+                break
+
         if "" in (solver_name, fea_results_name):
-            try:
-                raise NameError(
-                    "FEA solver or results not found, consider "
-                    "specifying manually using parametric.setup_fea()"
-                )
-            except NameError as e:
-                logger.exception(str(e))
-                raise
+            msg = (
+                "FEA solver or results not found, consider "
+                "specifying manually using parametric.setup_fea()"
+            )
+            logger.error(msg)
+            raise NameError(msg)
+
+        if (solver_name, fea_results_name) != (self.solver_name, self.fea_results_name):
+            # names were re-discovered: previously cached objects may be stale
+            self.invalidate_cache()
 
-        logger.debug(f"Found solver name: {solver_name}")
-        logger.debug(f"Found FEA results name: {fea_results_name}")
+        logger.debug("Found solver name: %s", solver_name)
+        logger.debug("Found FEA results name: %s", fea_results_name)
 
         self.solver_name = solver_name
         self.fea_results_name = fea_results_name
@@ -1,5 +1,8 @@
+import atexit
+import queue
 import logging
 import logging.config
+import logging.handlers
 
 # taken from https://guicommits.com/how-to-log-in-python-like-a-pro/
 ERROR_LOG_FILENAME = "./freecadparametricfea.log"
@@ -43,4 +46,20 @@ LOGGING_CONFIG = {
 }
 
 logging.config.dictConfig(LOGGING_CONFIG)
+
+# the configured handlers are moved behind a queue, and run in a background
+# thread: logging from the FEA loop never waits for the log file to be written
+_package_logger = logging.getLogger("FreecadParametricFEA")
+_log_handlers = _package_logger.handlers[:]
+for handler in _log_handlers:
+    _package_logger.removeHandler(handler)
+
+_log_queue = queue.SimpleQueue()
+_package_logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *_log_handlers, respect_handler_level=True
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logger = logging.getLogger(__name__)
@@ -0,0 +1,217 @@
+"""FreecadModelPool object: runs FEA test cases in parallel worker processes"""
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+import numpy as np
+
+from .freecadmodel import FreecadModel, reduce_results
+from .dispatcher import Dispatcher
+from .register_freecad import registered_freecad_path
+from .loghandler import logger
+
+# the FreecadModel owned by each worker process
+_worker_model = None
+# parameter setters of the worker model, by (object_name, constraint_name)
+_worker_setters: Dict[Tuple[str, str], Callable[[Any], None]] = {}
+
+
+def _init_worker(
+    document_path: str,
+    freecad_path: str,
+    worker_counter,
+    n_workers: int,
+    ccx_threads: int,
+) -> None:
+    """initialises a worker process: copies the FreeCAD document to a private
+    folder and opens it, with the solver working in the same folder, so that
+    workers never share files
+
+    Args:
+        document_path (str): path to the FreeCAD file
+        freecad_path (str): path to the FreeCAD Python libraries
+        worker_counter (multiprocessing.Value): shared counter used to number
+            the workers
+        n_workers (int): total number of workers in the pool
+        ccx_threads (int): threads of the CalculiX solver in each worker. If
+            0, the CPUs are shared out between the workers
+    """
+    global _worker_model
+
+    with worker_counter.get_lock():
+        worker_idx = worker_counter.value
+        worker_counter.value += 1
+
+    # give each worker its own share of the CPUs, so that the solver threads
+    # of different workers don't compete for the same cores
+    n_cpus = max(1, (os.cpu_count() or 1) // max(n_workers, 1))
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        worker_cpus = cpus[worker_idx % len(cpus) :: max(n_workers, 1)]
+        os.sched_setaffinity(0, set(worker_cpus))
+        n_cpus = len(worker_cpus)
+
+    work_dir = tempfile.mkdtemp(prefix=f"freecadparametricfea_{worker_idx}_")
+    atexit.register(shutil.rmtree, work_dir, ignore_errors=True)
+
+    local_document = os.path.join(work_dir, os.path.basename(document_path))
+    shutil.copyfile(document_path, local_document)
+
+    # the solver files of each worker go to its own folder too
+    solver_dir = os.path.join(work_dir, "solver")
+    os.makedirs(solver_dir)
+
+    _worker_model = FreecadModel(
+        document_path=local_document,
+        freecad_path=freecad_path,
+        working_dir=solver_dir,
+    )
+    _worker_model.ccx_threads = ccx_threads if ccx_threads > 0 else n_cpus
+    logger.debug("Worker %d opened %s", worker_idx, local_document)
+
+
+def _run_case(job: Tuple) -> Tuple[int, dict]:
+    """runs a single test case in a worker process
+
+    Args:
+        job (tuple): (case_idx, parameters, solver_name, results_name,
+            output_vars, export_path, output_groups) as built by
+            Dispatcher.imap_parameters
+
+    Returns:
+        (int, dict): the index of the test case and its results
+    """
+    return solve_case(_worker_model, _worker_setters, job)
+
+
+def solve_case(
+    model: FreecadModel,
+    setters: Dict[Tuple[str, str], Callable[[Any], None]],
+    job: Tuple,
+) -> Tuple[int, dict]:
+    """sets the parameters of a test case in a model and runs its FEA
+
+    Args:
+        model (FreecadModel): the model to run the test case in
+        setters (dict): parameter setters of the model by (object_name,
+            constraint_name), filled in as the parameters are first set
+        job (tuple): (case_idx, parameters, solver_name, results_name,
+            output_vars, export_path, output_groups) as built by
+            Dispatcher.imap_parameters
+
+    Returns:
+        (int, dict): the index of the test case and its results. If
+            output_groups is given, the results contain the "reduced" outputs
+            instead of the whole results fields
+    """
+    (
+        case_idx,
+        parameters,
+        solver_name,
+        results_name,
+        output_vars,
+        export_path,
+        output_groups,
+    ) = job
+
+    if solver_name != "":
+        model.solver_name = solver_name
+        model.fea_results_name = results_name
+
+    result = {"outputs": {}, "runtime": 0.0, "msg": "", "export_path": ""}
+
+    for (object_name, constraint_name, target_value) in parameters:
+        set_parameter = setters.get((object_name, constraint_name))
+        if set_parameter is None:
+            set_parameter = model.parameter_setter(object_name, constraint_name)
+            setters[(object_name, constraint_name)] = set_parameter
+
+        try:
+            set_parameter(target_value)
+        except ValueError as e:
+            result["msg"] = str(e)
+
+    start_time = time.perf_counter()
+    try:
+        fea_results_obj = model.run_fea()
+        result["runtime"] = time.perf_counter() - start_time
+
+        if output_groups is not None:
+            result["reduced"] = reduce_results(
+                fea_results_obj.getPropertyByName, output_groups
+            )
+        else:
+            # sent at full precision, for the user-defined reduction functions
+            for output_var in output_vars:
+                result["outputs"][output_var] = np.asarray(
+                    fea_results_obj.getPropertyByName(output_var)
+                )
+
+        if export_path:
+            model.export_fea_results(filename=export_path, export_format="vtk")
+            result["export_path"] = export_path
+
+    except RuntimeError as e:
+        result["msg"] = str(e)
+        logger.warning("Test case %s exited with error %s", case_idx, e)
+
+    return (case_idx, result)
+
+
+class FreecadModelPool(Dispatcher):
+    """Pool of worker processes, each one holding its own FreecadModel opened
+    from a private copy of the same FreeCAD document"""
+
+    def __init__(
+        self,
+        document_path: str,
+        freecad_path: str = "",
+        n_workers: int = 0,
+        ccx_threads: int = 0,
+    ) -> None:
+        """initialises a FreecadModelPool object
+
+        Args:
+            document_path (str): path to the FreeCAD file
+            freecad_path (str): path to the FreeCAD Python libraries
+            n_workers (int, optional): number of worker processes. Defaults to
+                the number of CPUs
+            ccx_threads (int, optional): threads of the CalculiX solver in each
+                worker. Defaults to sharing the CPUs out between the workers
+        """
+        self.filename = document_path
+        self.n_workers = n_workers if n_workers > 0 else (os.cpu_count() or 1)
+
+        # workers reuse the path found by this process rather than searching
+        # for FreeCAD again
+        if freecad_path == "":
+            freecad_path = registered_freecad_path()
+
+        # FreeCAD is not fork-safe: workers always start from a clean interpreter
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(
+                document_path,
+                freecad_path,
+                context.Value("i", 0),
+                self.n_workers,
+                ccx_threads,
+            ),
+        )
+        logger.debug("Started a pool of %d FreeCAD workers", self.n_workers)
+
+    def submit(self, job: Tuple) -> Future:
+        """sends a test case to the workers, see Dispatcher.submit()"""
+        return self._executor.submit(_run_case, job)
+
+    def close(self) -> None:
+        """shuts down the worker processes"""
+        self._executor.shutdown()
@@ -1,8 +1,13 @@
 """Provides a FreecadParametricFEA class to handle higher level parametric FEA functions,
     such as handling parameters and displaying results.
 """
+import csv
 import time
-from typing import Union
+import shutil
+import importlib.util
+from functools import partial
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Union
 from os import path
 import pandas as pd
 import numpy as np
@@ -13,10 +18,315 @@ from tqdm import tqdm
 
 import plotly.express as px
 
-from .freecadmodel import FreecadModel
+from .freecadmodel import FreecadModel, file_digest, reduce_results
+from .modelpool import FreecadModelPool
+from .dispatcher import Dispatcher, FreecadCmdDispatcher, SlurmDispatcher
 from .loghandler import logger
 
 
+def _cartesian(arrays: list) -> list:
+    """builds the cartesian product of the values of each parameter, one
+    column per parameter, without materialising a full d-dimensional grid
+    for each of them. Rows are in the same order as np.meshgrid(*arrays)
+    flattened: the second parameter varies slowest, then the first, then
+    the others in order
+
+    Args:
+        arrays (list): values of each parameter
+
+    Returns:
+        list of np.ndarray: one column per parameter, all of the same length
+    """
+    arrays = [np.asarray(a).ravel() for a in arrays]
+    if not arrays:
+        return []
+
+    # np.meshgrid's default "xy" indexing swaps the first two axes
+    order = list(range(len(arrays)))
+    if len(order) > 1:
+        order[0], order[1] = order[1], order[0]
+
+    lengths = [len(arrays[i]) for i in order]
+    columns = [np.empty(0)] * len(arrays)
+    outer = 1
+    for (position, i) in enumerate(order):
+        inner = int(np.prod(lengths[position + 1 :], dtype=np.int64))
+        columns[i] = np.tile(np.repeat(arrays[i], inner), outer)
+        outer *= lengths[position]
+
+    return columns
+
+
+# test case messages are mostly empty or repeated: Arrow-backed strings store
+# them more compactly than Python objects, when pyarrow is available
+_MSG_DTYPE = "string[pyarrow]" if importlib.util.find_spec("pyarrow") else "string"
+
+
+# reduction functions that are order statistics of the results, by quantile.
+# Several of them on the same results field are computed in a single pass
+_QUANTILE_REDUCTIONS = {
+    np.min: 0.0,
+    np.amin: 0.0,
+    np.median: 0.5,
+    np.max: 1.0,
+    np.amax: 1.0,
+}
+
+
+def _group_outputs(output_specs: List[tuple]) -> List[tuple]:
+    """groups the outputs by results field, so that each field is reduced from
+    a single array. Two or more order statistics of the same field (e.g. min
+    and max) are computed together by order_statistics()
+
+    Args:
+        output_specs (list of tuple): (output_var, reduction_fun, heading) of
+            each output
+
+    Returns:
+        list of tuple: (output_var, [(quantile, heading), ...],
+            [(reduction_fun, heading), ...]) of each results field, as taken
+            by reduce_results()
+    """
+    output_groups: Dict[str, list] = {}
+    for (output_var, reduction_fun, heading) in output_specs:
+        output_groups.setdefault(output_var, []).append((reduction_fun, heading))
+
+    grouped = []
+    for (output_var, reductions) in output_groups.items():
+        quantiles = [
+            (_QUANTILE_REDUCTIONS[reduction_fun], heading)
+            for (reduction_fun, heading) in reductions
+            if reduction_fun in _QUANTILE_REDUCTIONS
+        ]
+        # a single order statistic is cheaper to compute on its own
+        if len(quantiles) > 1:
+            reductions = [
+                (reduction_fun, heading)
+                for (reduction_fun, heading) in reductions
+                if reduction_fun not in _QUANTILE_REDUCTIONS
+            ]
+        else:
+            quantiles = []
+        grouped.append((output_var, quantiles, reductions))
+
+    return grouped
+
+
+def _reduction_id(fun) -> Optional[tuple]:
+    """identifies a reduction function in the fea_cache entries, so that
+    outputs with the same heading but different functions are told apart
+
+    Args:
+        fun (callable): function or partial
+
+    Returns:
+        tuple: module, qualified name and partial arguments of the function,
+            or None if it can't be identified, e.g. a lambda, a nested
+            function or a callable object
+    """
+    if isinstance(fun, partial):
+        func_id = _reduction_id(fun.func)
+        if func_id is None:
+            return None
+        return (func_id, repr(fun.args), repr(sorted(fun.keywords.items())))
+
+    module = getattr(fun, "__module__", None)
+    qualname = getattr(fun, "__qualname__", None)
+    if module is None or qualname is None or "<" in qualname:
+        return None
+    return (module, qualname)
+
+
+def _defined_in_main(fun) -> bool:
+    """checks whether a function comes from the __main__ module, e.g. a
+    notebook or script. It pickles by reference to __main__, which the spawned
+    worker processes can't import
+
+    Args:
+        fun (callable): function, partial or callable object
+
+    Returns:
+        bool: True if fun or the function it wraps is defined in __main__
+    """
+    while isinstance(fun, partial):
+        fun = fun.func
+    module = getattr(fun, "__module__", None) or type(fun).__module__
+    return module == "__main__" or type(fun).__module__ == "__main__"
+
+
+def _progress_miniters(n_cases: int) -> int:
+    """minimum number of test cases between two progress bar refreshes, so
+    that the bar is redrawn at most ~200 times per sweep"""
+    return max(1, n_cases // 200)
+
+
+def _cache_value(value):
+    """normalises a parameter value for use in a cache key, so that e.g.
+    np.float64(10) and 10 give the same key
+
+    Args:
+        value: parameter value
+
+    Returns:
+        float or str: the normalised value
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return str(value)
+
+
+def _sample(arrays: list, sampling: str, n_samples: int, seed=None) -> list:
+    """samples the values of each parameter instead of running all their
+    combinations. Numeric parameters are sampled anywhere between their
+    smallest and largest value, among the integers in between if all their
+    values are integers (e.g. mesh counts). The others (e.g. materials) are
+    sampled among their values
+
+    Args:
+        arrays (list): values of each parameter
+        sampling (str): "lhs" (latin hypercube) or "random"
+        n_samples (int): number of test cases
+        seed (int, optional): seed of the random number generator, for
+            reproducible samples
+
+    Raises:
+        NotImplementedError: if the sampling method is not implemented
+        ValueError: if n_samples is not a positive integer
+
+    Returns:
+        list of np.ndarray: one column per parameter, n_samples long
+    """
+    if sampling not in ("lhs", "random"):
+        raise NotImplementedError(f"Sampling method {sampling} not yet implemented")
+    if (
+        not isinstance(n_samples, (int, np.integer))
+        or isinstance(n_samples, bool)
+        or n_samples <= 0
+    ):
+        raise ValueError(
+            f"{sampling} sampling needs a positive number of samples, got {n_samples}"
+        )
+
+    rng = np.random.default_rng(seed)
+    n_params = len(arrays)
+
+    if sampling == "lhs":
+        # one sample in each of the n_samples strata of every parameter,
+        # with the strata shuffled independently for each parameter
+        strata = np.argsort(rng.random((n_samples, n_params)), axis=0)
+        unit_samples = (strata + rng.random((n_samples, n_params))) / n_samples
+    else:
+        unit_samples = rng.random((n_samples, n_params))
+
+    columns = []
+    for (i, values) in enumerate(arrays):
+        values = np.asarray(values).ravel()
+        u = unit_samples[:, i]
+        if np.issubdtype(values.dtype, np.integer):
+            # each integer from lo to hi takes an equal share of [0, 1)
+            (lo, hi) = (values.min(), values.max())
+            steps = np.minimum((u * (hi - lo + 1)).astype(values.dtype), hi - lo)
+            columns.append(lo + steps)
+        elif np.issubdtype(values.dtype, np.number):
+            (lo, hi) = (values.min(), values.max())
+            columns.append(lo + u * (hi - lo))
+        else:
+            columns.append(
+                values[np.minimum((u * len(values)).astype(int), len(values) - 1)]
+            )
+
+    return columns
+
+
+class _ResultsStream(ABC):
+    """append-only file that the results of each test case are written to as
+    soon as they are available"""
+
+    headings: List[str] = []
+
+    @abstractmethod
+    def write(self, test_case_idx, values: list) -> None:
+        """writes the results of a test case
+
+        Args:
+            test_case_idx: index of the test case in the results dataframe
+            values (list): value of each column, in the order of self.headings
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """closes the file"""
+
+
+class _CsvStream(_ResultsStream):
+    """results stream in a csv file"""
+
+    def __init__(self, filename: str, headings: List[str]) -> None:
+        self.headings = headings
+        self._file = open(filename, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([""] + headings)
+
+    def write(self, test_case_idx, values: list) -> None:
+        self._writer.writerow([test_case_idx] + values)
+        # a crashed sweep keeps the test cases completed so far
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ArrowStream(_ResultsStream):
+    """results stream in an Arrow IPC (.arrow) file, one record batch per
+    test case. Requires pyarrow"""
+
+    def __init__(self, filename: str, headings: List[str], columns: list) -> None:
+        """
+        Args:
+            filename (str): destination file
+            headings (list of str): column headings
+            columns (list of np.ndarray): values of each column, used to
+                choose the column types
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            msg = "Streaming results to an .arrow file requires pyarrow"
+            logger.error(msg)
+            raise
+
+        self._pa = pa
+        self.headings = headings
+        fields = [pa.field("test_case", pa.int64())]
+        for (heading, column) in zip(headings, columns):
+            if np.issubdtype(column.dtype, np.number):
+                fields.append(pa.field(heading, pa.from_numpy_dtype(column.dtype)))
+            else:
+                fields.append(pa.field(heading, pa.string()))
+        self._schema = pa.schema(fields)
+        self._types = [field.type for field in fields[1:]]
+
+        self._sink = pa.OSFile(filename, "wb")
+        self._writer = pa.ipc.new_stream(self._sink, self._schema)
+
+    def write(self, test_case_idx, values: list) -> None:
+        pa = self._pa
+        arrays = [pa.array([test_case_idx], type=pa.int64())]
+        for (value_type, value) in zip(self._types, values):
+            if pa.types.is_string(value_type):
+                value = str(value)
+            arrays.append(pa.array([value], type=value_type))
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        # a crashed sweep keeps the test cases completed so far
+        self._sink.flush()
+
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
 class parametric:
     """FreeCAD Parametric FEA object"""
 
@@ -35,9 +345,23 @@ class parametric:
         self.solver_name = ""
 
         self.freecad_path = freecad_path
+        # set by set_model()
+        self.freecad_document: Optional[FreecadModel] = None
 
         self.results_dataframe = pd.DataFrame()
 
+        # reduced outputs of the test cases solved so far, by parameter values
+        # then by (output_var, reduction function identity)
+        self.fea_cache: Dict[tuple, dict] = {}
+        # (output_var, reduction_fun, heading) of each output, for the
+        # duration of a run_parametric() call
+        self._output_specs: List[tuple] = []
+        # key of each output in the fea_cache entries, in the same order
+        self._output_cache_ids: List[Optional[tuple]] = []
+        # the same outputs grouped by output_var, as (output_var,
+        # [(quantile, heading), ...], [(reduction_fun, heading), ...])
+        self._output_groups: List[tuple] = []
+
         # initialise output headings to defaults
         self.set_outputs()
 
@@ -55,7 +379,7 @@ class parametric:
         elif isinstance(freecad_document, FreecadModel):
             self.freecad_document = freecad_document
 
-        logger.info(f"FreeCAD document {freecad_document} loaded successfully")
+        logger.info("FreeCAD document %s loaded successfully", freecad_document)
 
     def set_variables(self, variables: list):
         """Sets the variables to run the batch analysis over.
@@ -66,10 +390,14 @@ class parametric:
                 "object_name" (str): the object where the constraint is in,
                 "constraint_name" (str): the name of the constraint to modify
                 "constraint_values" (list of values):  values that the variable can assume
+                and can optionally contain:
+                "sort_priority" (int): variables with a higher priority change
+                less often while the test cases are run, e.g. because changing
+                them is slow. Doesn't affect the order of the results
         """
         self.variables = variables
 
-    def set_outputs(self, outputs: list = []):
+    def set_outputs(self, outputs: Optional[list] = None):
         """Sets the variables to return as an output.
 
         Args:
@@ -81,8 +409,10 @@ class parametric:
                     reduction function (e.g. np.max)
                 ?"column_label" (str): (optional) label for the column.
                     Defaults to the function's __qualname__
+                If empty or None, the max von Mises stress and the max
+                displacement are returned
         """
-        if outputs == []:
+        if not outputs:
             default_outputs = [
                 {
                     "output_var": "vonMises",
@@ -97,9 +427,21 @@ class parametric:
         else:
             self.outputs = outputs
 
-        logger.debug(f"Analysis outputs set to {self.outputs}")
+        logger.debug("Analysis outputs set to %s", self.outputs)
 
-    def setup_fea(self, fea_results_name: str, solver_name: str):
+    @property
+    def _param_headings(self) -> List[str]:
+        """dataframe headings of the variables, in the same order. Follows
+        self.variables, also when it is assigned directly"""
+        return [self._param_to_df_heading(p) for p in self.variables]
+
+    @property
+    def _output_headings(self) -> List[str]:
+        """dataframe headings of the outputs, in the same order. Follows
+        self.outputs, also when it is assigned directly"""
+        return [self._output_to_df_heading(o) for o in self.outputs]
+
+    def setup_fea(self, fea_results_name: str, solver_name: str, ccx_threads: int = 0):
         """sets up the FEA analysis object
 
         Args:
@@ -107,9 +449,14 @@ class parametric:
                 e.g. CCX_Results
             solver_name (str): name of the solver object in the document
                 e.g. SolverCcxTools
+            ccx_threads (int, optional): threads used by CalculiX for each
+                test case. With n_jobs, keep n_jobs * ccx_threads within the
+                number of cores. Defaults to the FreeCAD preferences, or to
+                sharing the cores out between the jobs when running with n_jobs
         """
         self.freecad_document.fea_results_name = fea_results_name
         self.freecad_document.solver_name = solver_name
+        self.freecad_document.ccx_threads = ccx_threads
 
     def run_parametric(
         self,
@@ -117,24 +464,67 @@ class parametric:
         export_results: bool = False,
         output_folder: str = "",
         quiet_mode: bool = False,
+        n_jobs: int = 1,
+        stream_to: str = "",
+        use_cache: bool = False,
+        sampling: str = "full",
+        n_samples: int = 0,
+        seed: Optional[int] = None,
+        dispatcher: Union[str, Dispatcher] = "local",
     ) -> pd.DataFrame:
         """runs the parametric sweep and returns the results
 
         Args:
             ?dry_run (bool): Doesn't run the FEA, but checks for model issues.
+                Without a model loaded, only builds the test matrix.
                 Defaults to False
             ?export_results (bool): export results in .vtk format for each analysis
                 Defaults to False
             ?output_folder (str): folder for results output
             ?quiet_mode (bool): suppresses all output.
                 Defaults to False
+            ?n_jobs (int): number of test cases to run in parallel, each in its
+                own process with a copy of the FreeCAD file saved on disk.
+                Scripts using it need an ``if __name__ == "__main__":`` guard.
+                Defaults to 1 (no parallelism)
+            ?stream_to (str): csv file that each test case is appended to as
+                soon as it completes, so that long sweeps keep their results
+                if interrupted. Files ending in .arrow are written in the Arrow
+                IPC stream format instead (requires pyarrow). Defaults to no
+                streaming
+            ?use_cache (bool): reuse the outputs of test cases already solved
+                with the same parameters and reduction functions instead of
+                running the FEA again. Changes to the document that are not
+                saved to disk or made through the parameters are not seen by
+                the cache. If output_folder is set, the cache is also kept on
+                disk in output_folder/.fea_cache.pkl. Not used when exporting
+                results, or with reduction functions that can't be identified
+                (e.g. lambdas). Defaults to False
+            ?sampling (str): how the test cases are chosen. Can be one of:
+                "full" (default): all the combinations of the variable values
+                "lhs": n_samples test cases by latin hypercube sampling
+                "random": n_samples test cases by uniform random sampling
+                Numeric variables are sampled anywhere between their smallest
+                and largest value, the others among their values
+            ?n_samples (int): number of test cases for "lhs" and "random"
+                sampling
+            ?seed (int): seed for "lhs" and "random" sampling, for
+                reproducible test cases. Defaults to a random seed
+            ?dispatcher (str or Dispatcher): where the test cases run. Can be
+                one of:
+                "local" (default): on this machine, see n_jobs
+                "slurm": one SLURM job per test case, with the default
+                    SlurmDispatcher options
+                "freecadcmd": all the test cases in a single freecadcmd
+                    process, see FreecadCmdDispatcher
+                or a Dispatcher object, e.g. a SlurmDispatcher with custom
+                sbatch options. The FreeCAD file must be saved on disk
 
         Returns:
-            pd.DataFrame: Pandas dataframe containing the results
+            pd.DataFrame: Pandas dataframe containing the results, and the
+                wall-clock time of each FEA in seconds (FEA_Runtime)
         """
-        # TODO: this should let the user choose the type of run
-        # e.g. "all" (full sampling), and other useful stuff like latin
-        # hypercube sampling, random sampling, adaptive sampling...
+        # TODO: adaptive sampling
 
         # change the target parameter in the CAD model.
         # as it stands it won't really support two parameters...
@@ -143,86 +533,266 @@ class parametric:
         #  - ran a single loop of all analyses over the dataframe
         #  - updated the dataframe?
 
+        if not self.outputs:
+            self.set_outputs()
+
         self.results_dataframe = self.populate_test_dataframe(
-            self.variables, self.outputs
+            self.variables,
+            self.outputs,
+            sampling=sampling,
+            n_samples=n_samples,
+            seed=seed,
         )
         logger.debug("Results dataframe initialised")
 
+        # without a model there is nothing to check: the test matrix is all
+        # a dry run can return
+        if dry_run and self.freecad_document is None:
+            return self.results_dataframe
+
+        # the outputs are only looked up and formatted once per sweep
+        self._output_specs = [
+            (o["output_var"], o["reduction_fun"], heading)
+            for (o, heading) in zip(self.outputs, self._output_headings)
+        ]
+        output_headings = self._output_headings
+        self._output_groups = _group_outputs(self._output_specs)
+        self._output_cache_ids = [
+            (output_var, _reduction_id(reduction_fun))
+            for (output_var, reduction_fun, _) in self._output_specs
+        ]
+
+        # dispatchers created here are also closed here
+        own_dispatcher = not isinstance(dispatcher, Dispatcher)
+        if dry_run:
+            dispatcher = None
+        elif dispatcher == "local":
+            dispatcher = None
+            if n_jobs > 1:
+                dispatcher = FreecadModelPool(
+                    document_path=self.freecad_document.filename,
+                    freecad_path=self.freecad_path,
+                    n_workers=n_jobs,
+                    ccx_threads=self.freecad_document.ccx_threads,
+                )
+        elif dispatcher == "slurm":
+            dispatcher = SlurmDispatcher(
+                document_path=self.freecad_document.filename,
+                freecad_path=self.freecad_path,
+            )
+        elif dispatcher == "freecadcmd":
+            dispatcher = FreecadCmdDispatcher(
+                document_path=self.freecad_document.filename
+            )
+        elif not isinstance(dispatcher, Dispatcher):
+            raise NotImplementedError(f"Dispatcher {dispatcher} not yet implemented")
+
+        # results and messages are written into preallocated arrays by test
+        # case position, and added to the dataframe once at the end. Test
+        # cases that failed keep their initial values
+        n_rows = len(self.results_dataframe)
+        results = {
+            heading: np.zeros(n_rows) for heading in output_headings + ["FEA_Runtime"]
+        }
+        results["Msg"] = np.full(n_rows, "", dtype=object)
+
+        stream = None
+        if stream_to != "" and not dry_run:
+            headings = list(self.results_dataframe.columns)
+            headings += [h for h in results.keys() if h not in headings]
+            if stream_to.endswith(".arrow"):
+                stream = _ArrowStream(
+                    stream_to,
+                    headings,
+                    [
+                        results[h]
+                        if h in results
+                        else self.results_dataframe[h].to_numpy()
+                        for h in headings
+                    ],
+                )
+            else:
+                stream = _CsvStream(stream_to, headings)
+
+        cache_keys = None
+        cache_file = ""
+        if use_cache and not dry_run and not export_results:
+            if any(
+                reduction_id is None for (_, reduction_id) in self._output_cache_ids
+            ):
+                logger.warning(
+                    "Not using the cache: reduction functions such as lambdas "
+                    "can't be told apart"
+                )
+            else:
+                cache_keys = self._cache_keys()
+                if output_folder != "":
+                    cache_file = path.join(output_folder, ".fea_cache.pkl")
+                    self._load_fea_cache(cache_file)
+
+        # test cases with the same parameters as an earlier one are solved
+        # once, then copied
+        source_rows = self._source_rows()
+        rows = np.flatnonzero(source_rows == np.arange(len(source_rows)))
+
+        try:
+            if dispatcher is not None:
+                self._run_parallel(
+                    results=results,
+                    rows=rows,
+                    dispatcher=dispatcher,
+                    export_results=export_results,
+                    output_folder=output_folder,
+                    quiet_mode=quiet_mode,
+                    stream=stream,
+                    cache_keys=cache_keys,
+                )
+            else:
+                self._run_serial(
+                    results=results,
+                    rows=rows,
+                    dry_run=dry_run,
+                    export_results=export_results,
+                    output_folder=output_folder,
+                    quiet_mode=quiet_mode,
+                    stream=stream,
+                    cache_keys=cache_keys,
+                )
+            if len(rows) < len(source_rows):
+                self._copy_duplicate_cases(
+                    results=results,
+                    source_rows=source_rows,
+                    export_results=export_results and not dry_run,
+                    output_folder=output_folder,
+                    stream=stream,
+                )
+        finally:
+            if dispatcher is not None and own_dispatcher:
+                dispatcher.close()
+            if stream is not None:
+                stream.close()
+            if cache_file != "":
+                self._save_fea_cache(cache_file)
+
+        msgs = results.pop("Msg")
+        for (heading, values) in results.items():
+            self.results_dataframe[heading] = values
+        self.results_dataframe["Msg"] = pd.array(msgs, dtype=_MSG_DTYPE)
+
+        return self.results_dataframe
+
+    def _run_serial(
+        self,
+        results: Dict[str, np.ndarray],
+        rows: np.ndarray,
+        dry_run: bool,
+        export_results: bool,
+        output_folder: str,
+        quiet_mode: bool,
+        stream: Optional[_ResultsStream] = None,
+        cache_keys: Optional[List[tuple]] = None,
+    ) -> None:
+        """runs the test cases one after the other in this process, see
+        run_parametric()
+
+        Args:
+            results (dict): output and message arrays by dataframe heading,
+                filled in with the results of each test case
+            rows (np.ndarray): positions of the test cases to run
+            stream (_ResultsStream, optional): file the test cases are written to
+                as they complete
+            cache_keys (list of tuple, optional): key of each test case in
+                fea_cache. Defaults to not using the cache
+        """
         # iterate over all test cases
 
         if not quiet_mode:
-            pbar = tqdm(total=len(self.results_dataframe), desc="Running test cases")
+            # cached test cases complete in microseconds: refreshing the bar
+            # on every one of them would cost more than running them
+            pbar = tqdm(
+                total=len(rows),
+                desc="Running test cases",
+                unit="case",
+                miniters=_progress_miniters(len(rows)),
+            )
+
+        # each parameter is resolved in the model once for the whole sweep
+        parameter_setters = [
+            self.freecad_document.parameter_setter(
+                object_name=parameter["object_name"],
+                constraint_name=parameter["constraint_name"],
+            )
+            for parameter in self.variables
+        ]
+        # the parameter values are read from plain arrays, by position
+        param_columns = self._param_columns()
+        test_case_indices = self.results_dataframe.index
+        if export_results:
+            export_paths = self._export_filenames(output_folder)
 
-        for (test_case_idx, test_case_data) in self.results_dataframe.iterrows():
-            # change each parameter to the value specified in the pd column:
-            for parameter in self.variables:
-                df_heading = self._param_to_df_heading(parameter)
+        run_order = self._run_order(param_columns)
+        is_run = np.zeros(len(run_order), dtype=bool)
+        is_run[rows] = True
 
+        for row_idx in run_order[is_run[run_order]]:
+            test_case_idx = test_case_indices[row_idx]
+            if cache_keys is not None and self._load_cached_case(
+                cache_keys[row_idx], results, row_idx
+            ):
+                logger.info("FEA test case %s found in cache", test_case_idx)
+                if stream is not None:
+                    self._stream_case(stream, results, row_idx, test_case_idx)
+                if not quiet_mode:
+                    pbar.update(1)  # type: ignore (only exists if not quiet_mode)
+                continue
+
+            # change each parameter to the value specified in the pd column.
+            # The model skips the parameters that keep the same value
+            for (set_parameter, param_column) in zip(parameter_setters, param_columns):
                 try:
-                    self.freecad_document.change_parameter(
-                        object_name=parameter["object_name"],
-                        constraint_name=parameter["constraint_name"],
-                        target_value=test_case_data[df_heading],
-                    )
+                    set_parameter(param_column[row_idx])
                 except ValueError as e:
-                    self.results_dataframe.loc[  # type: ignore (Pylance's fault)
-                        test_case_idx, "Msg"
-                    ] = str(e)
+                    results["Msg"][row_idx] = str(e)
+
+            # recompute the model once for all the parameters of this test case
+            self.freecad_document.commit_parameters()
 
             # run (& time) the FEA
             if not dry_run:
-                start_time = time.process_time()
+                start_time = time.perf_counter()
 
                 try:
                     fea_results_obj = self.freecad_document.run_fea()
-                    fea_runtime = time.process_time() - start_time
-                    logger.info(f"FEA test case {test_case_idx} ran in {fea_runtime}s")
-
-                    if self.outputs == []:
-                        self.set_outputs()
-                    for output in self.outputs:
-                        self.results_dataframe.loc[
-                            test_case_idx, self._output_to_df_heading(output)
-                        ] = output[  # type: ignore (looks like Pylance's fault)
-                            "reduction_fun"
-                        ](
-                            fea_results_obj.getPropertyByName(output["output_var"])
-                        )
+                    fea_runtime = time.perf_counter() - start_time
+                    logger.info(
+                        "FEA test case %s ran in %ss", test_case_idx, fea_runtime
+                    )
 
-                    self.results_dataframe.loc[
-                        test_case_idx, "FEA_Runtime"
-                    ] = fea_runtime  # type: ignore (looks like Pylance's fault)
+                    self._reduce_outputs(
+                        fea_results_obj.getPropertyByName, results, row_idx
+                    )
+                    results["FEA_Runtime"][row_idx] = fea_runtime
+                    if cache_keys is not None:
+                        self._store_cached_case(cache_keys[row_idx], results, row_idx)
 
                     # export if requested
                     # TODO: try and join the VTK files together as frames
                     if export_results:
-
-                        (folder, filename) = path.split(self.freecad_document.filename)
-                        (fn, _) = path.splitext(filename)
-
-                        if output_folder != "":
-                            folder = output_folder
-
-                        n = int(
-                            np.ceil(np.log10(len(self.results_dataframe) + 1))
-                        )  # number of digits for vtk file
-
                         self.freecad_document.export_fea_results(
-                            filename=path.join(
-                                folder, f"FEA_{fn}_{test_case_idx:0{n}}.vtu"
-                            ),
+                            filename=export_paths[row_idx],
                             export_format="vtk",
                         )
 
                 # TODO: may want to add runtime errors to the dataframe also
                 # when in dry run
                 except RuntimeError as e:
-                    self.results_dataframe.loc[
-                        test_case_idx, "Msg"
-                    ] = str(  # type:ignore (looks like Pylance's fault)
-                        e
+                    results["Msg"][row_idx] = str(e)
+                    logger.warning(
+                        "Test case %s exited with error %s", test_case_idx, e
                     )
-                    logger.warning(f"Test case {test_case_idx} exited with error {e}")
+
+                if stream is not None:
+                    self._stream_case(stream, results, row_idx, test_case_idx)
 
             if not quiet_mode:
                 pbar.update(1)  # type: ignore (only exists if quiet_mode is false)
@@ -230,15 +800,447 @@ class parametric:
         if not quiet_mode:
             pbar.close()  # type: ignore (only exists if quiet_mode is false)
 
-        return self.results_dataframe
+    def _run_parallel(
+        self,
+        results: Dict[str, np.ndarray],
+        rows: np.ndarray,
+        dispatcher: Dispatcher,
+        export_results: bool,
+        output_folder: str,
+        quiet_mode: bool,
+        stream: Optional[_ResultsStream] = None,
+        cache_keys: Optional[List[tuple]] = None,
+    ) -> None:
+        """runs the test cases outside of this process, see run_parametric()
 
-    def populate_test_dataframe(self, variables, outputs) -> pd.DataFrame:
+        Args:
+            results (dict): output and message arrays by dataframe heading,
+                filled in with the results of each test case
+            rows (np.ndarray): positions of the test cases to run
+            dispatcher (Dispatcher): runs the test cases
+            stream (_ResultsStream, optional): file the test cases are written to
+                as they complete
+            cache_keys (list of tuple, optional): key of each test case in
+                fea_cache. Defaults to not using the cache
+        """
+        test_case_indices = self.results_dataframe.index
+
+        # test cases found in the cache are not sent to the workers
+        pending_rows = []
+        for row_idx in rows.tolist():
+            if cache_keys is not None and self._load_cached_case(
+                cache_keys[row_idx], results, row_idx
+            ):
+                logger.info(
+                    "FEA test case %s found in cache", test_case_indices[row_idx]
+                )
+                if stream is not None:
+                    self._stream_case(
+                        stream, results, row_idx, test_case_indices[row_idx]
+                    )
+            else:
+                pending_rows.append(row_idx)
+
+        # the workers open the model as saved on disk: the parameters applied
+        # to it in this process are set again before the swept ones
+        fixed_parameters = self._fixed_parameters()
+        param_columns = self._param_columns()
+        param_tuples = [
+            fixed_parameters
+            + [
+                (p["object_name"], p["constraint_name"], param_column[row_idx])
+                for (p, param_column) in zip(self.variables, param_columns)
+            ]
+            for row_idx in pending_rows
+        ]
+
+        export_paths = None
+        if export_results:
+            all_export_paths = self._export_filenames(output_folder)
+            export_paths = [all_export_paths[row_idx] for row_idx in pending_rows]
+
+        output_vars = [output_var for (output_var, _, _) in self._output_groups]
+
+        # the workers reduce the results themselves when the reduction
+        # functions can be sent to them, rather than sending back whole
+        # results fields
+        output_groups = None
+        reduction_funs = [
+            reduction_fun
+            for (_, _, reductions) in self._output_groups
+            for (reduction_fun, _) in reductions
+        ]
+        if any(_defined_in_main(f) for f in reduction_funs):
+            logger.debug("Reduction functions defined in __main__, reducing here")
+        else:
+            try:
+                pickle.dumps(self._output_groups)
+                output_groups = self._output_groups
+            except (pickle.PicklingError, AttributeError, TypeError):
+                logger.debug("Reduction functions can't be pickled, reducing here")
+
+        # test cases are collected as they complete, in any order
+        completed_cases = dispatcher.imap_parameters(
+            param_tuples,
+            solver_name=self.freecad_document.solver_name,
+            results_name=self.freecad_document.fea_results_name,
+            output_vars=output_vars,
+            export_paths=export_paths,
+            output_groups=output_groups,
+        )
+        if not quiet_mode:
+            completed_cases = tqdm(
+                completed_cases,
+                total=len(param_tuples),
+                desc="Running test cases",
+                unit="case",
+                miniters=_progress_miniters(len(param_tuples)),
+            )
+
+        for (case_idx, case_result) in completed_cases:
+            row_idx = pending_rows[case_idx]
+            test_case_idx = test_case_indices[row_idx]
+            results["Msg"][row_idx] = case_result["msg"]
+
+            reduced = case_result.get("reduced")
+            if reduced or case_result["outputs"]:
+                logger.info(
+                    "FEA test case %s ran in %ss",
+                    test_case_idx,
+                    case_result["runtime"],
+                )
+                if reduced:
+                    for (heading, value) in reduced.items():
+                        results[heading][row_idx] = value
+                else:
+                    self._reduce_outputs(case_result["outputs"].get, results, row_idx)
+                results["FEA_Runtime"][row_idx] = case_result["runtime"]
+                if cache_keys is not None:
+                    self._store_cached_case(cache_keys[row_idx], results, row_idx)
+
+            if stream is not None:
+                self._stream_case(stream, results, row_idx, test_case_idx)
+
+    def _source_rows(self) -> np.ndarray:
+        """finds the first test case with the same parameters as each test case
+
+        Returns:
+            np.ndarray: for each row of the results dataframe, the position of
+                the first row with the same parameter values
+        """
+        n_rows = len(self.results_dataframe)
+        param_columns = self._param_columns()
+        if n_rows == 0 or not param_columns:
+            return np.arange(n_rows)
+
+        # rows are compared through the integer codes of their values
+        codes = np.column_stack([pd.factorize(c)[0] for c in param_columns])
+        (_, first_rows, inverse) = np.unique(
+            codes, axis=0, return_index=True, return_inverse=True
+        )
+        return first_rows[inverse.ravel()]
+
+    def _copy_duplicate_cases(
+        self,
+        results: Dict[str, np.ndarray],
+        source_rows: np.ndarray,
+        export_results: bool,
+        output_folder: str,
+        stream: Optional[_ResultsStream] = None,
+    ) -> None:
+        """copies the results of the test cases that were run to the test
+        cases with the same parameters. Copies take no FEA_Runtime
+
+        Args:
+            results (dict): output and message arrays by dataframe heading
+            source_rows (np.ndarray): position of the test case each test case
+                is a copy of, as returned by _source_rows()
+            export_results (bool): also copy the exported .vtu files
+            output_folder (str): folder of the exported files
+            stream (_ResultsStream, optional): file the test cases are written
+                to as they complete
+        """
+        duplicate_rows = np.flatnonzero(source_rows != np.arange(len(source_rows)))
+        for values in results.values():
+            values[duplicate_rows] = values[source_rows[duplicate_rows]]
+        results["FEA_Runtime"][duplicate_rows] = 0.0
+
+        if export_results:
+            export_paths = self._export_filenames(output_folder)
+
+        test_case_indices = self.results_dataframe.index
+        for row_idx in duplicate_rows.tolist():
+            logger.info(
+                "FEA test case %s is the same as %s",
+                test_case_indices[row_idx],
+                test_case_indices[source_rows[row_idx]],
+            )
+            if export_results and path.isfile(export_paths[source_rows[row_idx]]):
+                shutil.copyfile(
+                    export_paths[source_rows[row_idx]], export_paths[row_idx]
+                )
+            if stream is not None:
+                self._stream_case(stream, results, row_idx, test_case_indices[row_idx])
+
+    def _fixed_parameters(self) -> List[tuple]:
+        """lists the parameters already applied to the model that the sweep
+        does not change, e.g. by an earlier sweep over other variables
+
+        Returns:
+            list of tuple: (object_name, constraint_name, value) of each
+                parameter, with the values as applied to the model
+        """
+        param_ids = {(p["object_name"], p["constraint_name"]) for p in self.variables}
+        param_state = self.freecad_document._param_state
+        return [
+            (*param_id, param_state[param_id])
+            for param_id in sorted(param_state)
+            if param_id not in param_ids
+        ]
+
+    def _cache_keys(self) -> List[tuple]:
+        """builds the fea_cache key of each test case, from the contents of the
+        model file and all the parameter values applied to the model, in any
+        order
+
+        Returns:
+            list of tuple: one key per row of the results dataframe
+        """
+        param_ids = [(p["object_name"], p["constraint_name"]) for p in self.variables]
+        model_id = file_digest(self.freecad_document.filename)
+        fixed_parameters = [
+            (object_name, constraint_name, _cache_value(value))
+            for (object_name, constraint_name, value) in self._fixed_parameters()
+        ]
+
+        # normalised once per column rather than once per value
+        param_columns = [
+            [_cache_value(value) for value in param_column.tolist()]
+            for param_column in self._param_columns()
+        ]
+
+        return [
+            (
+                model_id,
+                tuple(
+                    sorted(
+                        fixed_parameters
+                        + [
+                            (object_name, constraint_name, value)
+                            for ((object_name, constraint_name), value) in zip(
+                                param_ids, parameter_values
+                            )
+                        ]
+                    )
+                ),
+            )
+            for parameter_values in zip(*param_columns)
+        ]
+
+    def _run_order(self, param_columns: List[np.ndarray]) -> np.ndarray:
+        """orders the test cases so that the variables with the highest
+        "sort_priority" change the least often
+
+        Args:
+            param_columns (list of np.ndarray): values of each parameter, as
+                returned by _param_columns()
+
+        Returns:
+            np.ndarray: positions of the test cases, in the order to run them
+        """
+        prioritised = sorted(
+            (
+                (parameter["sort_priority"], param_idx)
+                for (param_idx, parameter) in enumerate(self.variables)
+                if "sort_priority" in parameter
+            )
+        )
+        n_rows = len(self.results_dataframe)
+        if not prioritised:
+            return np.arange(n_rows)
+
+        # np.lexsort sorts by the last key first, and is stable: equal values
+        # are grouped together and the other variables keep their order
+        sort_keys = [
+            pd.factorize(param_columns[param_idx])[0] for (_, param_idx) in prioritised
+        ]
+        return np.lexsort(sort_keys)
+
+    def _param_columns(self) -> List[np.ndarray]:
+        """extracts the values of each parameter from the results dataframe
+
+        Returns:
+            list of np.ndarray: one array per variable, in the same order as
+                self.variables and as the dataframe rows
+        """
+        return [
+            self.results_dataframe[heading].to_numpy()
+            for heading in self._param_headings
+        ]
+
+    def _load_cached_case(
+        self, key: tuple, results: Dict[str, np.ndarray], row_idx: int
+    ) -> bool:
+        """copies the cached outputs of a test case into the output arrays
+
+        Args:
+            key (tuple): key of the test case in fea_cache
+            results (dict): output arrays by dataframe heading
+            row_idx (int): position of the test case in the output arrays
+
+        Returns:
+            bool: True if all the outputs of the test case were cached
+        """
+        cached = self.fea_cache.get(key)
+        if cached is None:
+            return False
+
+        if not all(cache_id in cached for cache_id in self._output_cache_ids):
+            return False
+
+        for ((_, _, heading), cache_id) in zip(
+            self._output_specs, self._output_cache_ids
+        ):
+            results[heading][row_idx] = cached[cache_id]
+        results["FEA_Runtime"][row_idx] = 0.0
+        return True
+
+    def _store_cached_case(
+        self, key: tuple, results: Dict[str, np.ndarray], row_idx: int
+    ) -> None:
+        """adds the outputs of a solved test case to fea_cache. Test cases with
+        an error message are not cached, e.g. when a parameter could not be
+        applied and the FEA ran on another geometry
+
+        Args:
+            key (tuple): key of the test case in fea_cache
+            results (dict): output arrays by dataframe heading
+            row_idx (int): position of the test case in the output arrays
+        """
+        if results["Msg"][row_idx] != "":
+            return
+
+        cached = self.fea_cache.setdefault(key, {})
+        for ((_, _, heading), cache_id) in zip(
+            self._output_specs, self._output_cache_ids
+        ):
+            cached[cache_id] = results[heading][row_idx]
+
+    def _load_fea_cache(self, cache_file: str) -> None:
+        """adds the test cases cached on disk to fea_cache
+
+        Args:
+            cache_file (str): pickle file written by _save_fea_cache()
+        """
+        if not path.isfile(cache_file):
+            return
+
+        try:
+            with open(cache_file, "rb") as f:
+                self.fea_cache.update(pickle.load(f))
+            logger.debug("Loaded FEA cache from %s", cache_file)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            logger.warning("Ignoring unreadable FEA cache %s: %s", cache_file, e)
+
+    def _save_fea_cache(self, cache_file: str) -> None:
+        """writes fea_cache to disk
+
+        Args:
+            cache_file (str): destination pickle file
+        """
+        try:
+            with open(cache_file, "wb") as f:
+                pickle.dump(self.fea_cache, f)
+        except OSError as e:
+            logger.warning("Could not save the FEA cache to %s: %s", cache_file, e)
+
+    def _stream_case(
+        self,
+        stream: _ResultsStream,
+        results: Dict[str, np.ndarray],
+        row_idx: int,
+        test_case_idx,
+    ) -> None:
+        """writes a completed test case to the results stream
+
+        Args:
+            stream (_ResultsStream): destination stream
+            results (dict): output arrays by dataframe heading
+            row_idx (int): position of the test case
+            test_case_idx: index of the test case in the results dataframe
+        """
+        stream.write(
+            test_case_idx,
+            [
+                results[heading][row_idx]
+                if heading in results
+                else self.results_dataframe.at[test_case_idx, heading]
+                for heading in stream.headings
+            ],
+        )
+
+    def _reduce_outputs(
+        self, get_values, results: Dict[str, np.ndarray], row_idx: int
+    ) -> None:
+        """applies the reduction functions of all the outputs to the FEA results
+        of a test case
+
+        Args:
+            get_values (function handle): returns the values of a results field
+                (e.g. vonMises), given its name
+            results (dict): output arrays by dataframe heading
+            row_idx (int): position of the test case in the output arrays
+        """
+        reduced = reduce_results(get_values, self._output_groups)
+        for (heading, value) in reduced.items():
+            results[heading][row_idx] = value
+
+    def _export_filenames(self, output_folder: str) -> List[str]:
+        """paths of the .vtu files exported for each test case
+
+        Args:
+            output_folder (str): folder for results output. Defaults to the
+                folder of the FreeCAD file if empty
+
+        Returns:
+            list of str: one path per row of the results dataframe
+        """
+        (folder, filename) = path.split(self.freecad_document.filename)
+        (fn, _) = path.splitext(filename)
+
+        if output_folder != "":
+            folder = output_folder
+
+        n = int(
+            np.ceil(np.log10(len(self.results_dataframe) + 1))
+        )  # number of digits for vtk file
+        prefix = path.join(folder, f"FEA_{fn}_")
+
+        return [
+            f"{prefix}{test_case_idx:0{n}}.vtu"
+            for test_case_idx in self.results_dataframe.index
+        ]
+
+    def populate_test_dataframe(
+        self,
+        variables,
+        outputs,
+        sampling: str = "full",
+        n_samples: int = 0,
+        seed: Optional[int] = None,
+    ) -> pd.DataFrame:
         """Populates FreecadParametricFEA.results_dataframe with the
         test matrix to be run by the FEA batch. Uses self.variables
         and self.results.
 
         Args:
             variables (list): variables as defined in set_variables()
+            outputs (list): outputs as defined in set_outputs()
+            sampling (str, optional): "full", "lhs" or "random", see
+                run_parametric(). Defaults to "full"
+            n_samples (int, optional): number of test cases for "lhs" and
+                "random" sampling
+            seed (int, optional): seed for "lhs" and "random" sampling
 
         Returns:
             pd.DataFrame: dataframe with test conditions and empty
@@ -246,32 +1248,31 @@ class parametric:
             param_headings: headings in the dataframe related to the variables
             output_headings: headings in the dataframe related to the output
         """
-        param_vals = []
-        param_headings = []
-        output_headings = []
-
-        for parameter in variables:
-            param_vals.append(parameter["constraint_values"])
-            param_headings.append(self._param_to_df_heading(parameter))
+        param_vals = [parameter["constraint_values"] for parameter in variables]
 
-        for output in outputs:
-            output_headings.append(self._output_to_df_heading(output))
+        param_headings = [self._param_to_df_heading(p) for p in variables]
+        output_headings = [self._output_to_df_heading(o) for o in outputs]
 
         # Build list of n-param values
-        grid = np.meshgrid(*param_vals)
-        grid_list = list(x.ravel() for x in grid)
-
-        df = pd.DataFrame()
+        if sampling == "full":
+            grid_list = _cartesian(param_vals)
+        else:
+            grid_list = _sample(param_vals, sampling, n_samples, seed)
 
-        for (count, column) in enumerate(param_headings):
-            df[column] = grid_list[count]
+        n_rows = len(grid_list[0]) if grid_list else 0
 
-        for column in output_headings:
-            df[column] = 0
+        # a single zeroed float64 block backs all the numeric results columns,
+        # so writing the results never changes their dtype
+        results_block = np.zeros((len(output_headings) + 1, n_rows))
 
+        data = dict(zip(param_headings, grid_list))
+        data.update(zip(output_headings, results_block[:-1]))
         # generic empty data
-        df["Msg"] = ""
-        df["FEA_Runtime"] = 0
+        data["Msg"] = pd.array([""] * n_rows, dtype=_MSG_DTYPE)
+        # wall-clock time of each FEA in seconds, including the solver process
+        data["FEA_Runtime"] = results_block[-1]
+
+        df = pd.DataFrame(data, copy=False)
         logger.debug("Empty dataframe created")
         return df
 
@@ -279,28 +1280,29 @@ class parametric:
         """Plots the FEM analysis results using Plotly"""
 
         logger.debug("Preparing to plot FEA results")
-        for output in self.outputs:
-            if (len(self.variables)) == 1:
-                fig = px.line(
-                    self.results_dataframe,
-                    x=self._param_to_df_heading(self.variables[0]),
-                    y=self._output_to_df_heading(output),
-                )
-            elif (len(self.variables)) == 2:
-                fig = px.line(
-                    self.results_dataframe,
-                    x=self._param_to_df_heading(self.variables[0]),
-                    y=self._output_to_df_heading(output),
-                    color=self._param_to_df_heading(self.variables[1]),
-                )
-            else:
-                raise NotImplementedError(
-                    "Plotting more than 2 variables not supported yet"
-                )
+        if len(self.variables) not in (1, 2):
+            raise NotImplementedError("Plotting is only supported for 1 or 2 variables")
 
+        param_headings = self._param_headings
+        x = param_headings[0]
+        color = None
+        if len(param_headings) == 2:
+            color = param_headings[1]
+
+        for y in self._output_headings:
+            # WebGL rendering stays responsive for sweeps with many test cases
+            fig = px.line(
+                self.results_dataframe,
+                x=x,
+                y=y,
+                color=color,
+                render_mode="webgl",
+            )
             fig.show()
 
-    def save_fea_results(self, results_filename: str, mode: str = "csv") -> None:
+    def save_fea_results(
+        self, results_filename: str, mode: str = "csv", engine: str = "pandas"
+    ) -> None:
         """Saves the results of the analysis to a file.
 
         Args:
@@ -309,12 +1311,36 @@ class parametric:
                 "csv" (default): comma separated values, as exported by Pandas
                 "json": json file as exported by Pandas
                 "pickle": .pickle file containing the Pandas dataframe
+                "parquet": zstd-compressed Apache Parquet file (requires
+                    pyarrow). Much faster to write and smaller than csv for
+                    large sweeps
+            engine (str, optional): csv writer. Can be one of:
+                "pandas" (default)
+                "pyarrow": pyarrow's multithreaded csv writer (requires
+                    pyarrow). Much faster for large sweeps, but quotes the
+                    headings and text values
 
         Raises:
-            NotImplementedError: if an export mode is not implemented.
+            NotImplementedError: if an export mode or csv engine is not
+                implemented.
+            ImportError: if mode is "parquet" or engine is "pyarrow" and
+                pyarrow is not installed.
         """
-        if mode == "csv":
-            self.results_dataframe.to_csv(results_filename)
+        if mode == "csv" and engine == "pyarrow":
+            import pyarrow as pa
+            import pyarrow.csv
+
+            # the index is written as a first column with no heading, as
+            # pandas does
+            table = pa.Table.from_pandas(
+                self.results_dataframe.reset_index(names=""), preserve_index=False
+            )
+            pyarrow.csv.write_csv(table, results_filename)
+        elif mode == "csv" and engine == "pandas":
+            # written in chunks rather than formatted into one giant string
+            self.results_dataframe.to_csv(results_filename, chunksize=10_000)
+        elif mode == "csv":
+            raise NotImplementedError(f"CSV engine {engine} not yet implemented")
         elif mode == "json":
             self.results_dataframe.to_json(
                 results_filename, lines=True, orient="records"
@@ -322,6 +1348,10 @@ class parametric:
         elif mode == "pickle":
             with open(results_filename, "wb") as f:
                 pickle.dump(self.results_dataframe, f)
+        elif mode == "parquet":
+            self.results_dataframe.to_parquet(
+                results_filename, engine="pyarrow", compression="zstd"
+            )
         else:
             raise NotImplementedError(f"Export mode {mode} not yet implemented")
 
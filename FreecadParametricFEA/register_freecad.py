@@ -1,9 +1,22 @@
 import os
 import sys
 import glob
+import importlib
+from typing import Set
 
 from .loghandler import logger
 
+FreeCAD = None
+# FreeCAD paths already added to sys.path (normalised)
+_REGISTERED_PATHS: Set[str] = set()
+# path FreeCAD was last successfully imported from
+_RESOLVED_PATH = ""
+
+# FreeCAD modules only needed by some workflows, imported on first use
+femtools = None
+vtkResults = None
+import_materials = None
+
 
 def register_freecad(freecad_path: str = ""):
     """registers the freecad path and femtools in os.PATH
@@ -14,7 +27,23 @@ def register_freecad(freecad_path: str = ""):
 
     Raises:
         ImportError: if the specified folder does not contain the FreeCAD Python libraries
+
+    Returns:
+        module: the FreeCAD module. The FEM modules are available through
+            get_femtools() and get_vtk_results()
     """
+    global FreeCAD, _RESOLVED_PATH
+
+    # already registered: nothing to search for
+    if FreeCAD is not None and (freecad_path is None or freecad_path == ""):
+        return FreeCAD
+
+    # already importable, e.g. when running inside FreeCAD itself
+    if (freecad_path is None or freecad_path == "") and "FreeCAD" in sys.modules:
+        FreeCAD = sys.modules["FreeCAD"]
+        logger.debug("Using the FreeCAD module already loaded")
+        return FreeCAD
+
     supported_platforms = {
         "win32": [
             "C:/Program Files/FreeCAD *",
@@ -26,52 +55,94 @@ def register_freecad(freecad_path: str = ""):
     if freecad_path is None or freecad_path == "":
         this_platform = sys.platform
         if this_platform not in supported_platforms.keys():
-            try:
-                raise ValueError(
-                    f"Your platform ({this_platform}) is not yet explicitly supported. "
-                    "You can still specify the path to FreeCAD manually using "
-                    'parametric(freecad_path="path/to/freecad")'
-                )
-            except ValueError as e:
-                logger.exception(str(e))
-                raise
+            msg = (
+                f"Your platform ({this_platform}) is not yet explicitly supported. "
+                "You can still specify the path to FreeCAD manually using "
+                'parametric(freecad_path="path/to/freecad")'
+            )
+            logger.error(msg)
+            raise ValueError(msg)
         for possible_path in supported_platforms[this_platform]:
             d = glob.glob(os.path.normpath(possible_path))
             if (len(d)) > 1:
-                try:
-                    raise ValueError(
-                        "You seem to have multiple FreeCAD installations in your system. "
-                        "You must specify the path to FreeCAD manually using "
-                        'parametric(freecad_path="path/to/freecad")'
-                    )
-                except ValueError as e:
-                    logger.exception(str(e))
-                    raise
+                msg = (
+                    "You seem to have multiple FreeCAD installations in your system. "
+                    "You must specify the path to FreeCAD manually using "
+                    'parametric(freecad_path="path/to/freecad")'
+                )
+                logger.error(msg)
+                raise ValueError(msg)
 
             if (len(d)) == 0:
-                logger.debug(f"FreeCAD not found in {possible_path}")
+                logger.debug("FreeCAD not found in %s", possible_path)
 
             if (len(d)) == 1:
                 freecad_path = d[0]
-                logger.debug(f"Found FreeCAD at {freecad_path}")
+                logger.debug("Found FreeCAD at %s", freecad_path)
                 break
 
     if not freecad_path.endswith("bin"):
         freecad_path = os.path.join(freecad_path, "bin")
 
+    freecad_path = os.path.normpath(freecad_path)
+    if freecad_path in _REGISTERED_PATHS and FreeCAD is not None:
+        return FreeCAD
+
     if freecad_path not in sys.path:
-        sys.path.append(os.path.normpath(freecad_path))
+        sys.path.append(freecad_path)
+    _REGISTERED_PATHS.add(freecad_path)
     # TODO: should automagically try to find freecad in the usual suspect folders;
     # it should also automatically add /bin if the user didn't specify it
     try:
-        global FreeCAD, femtools, vtkResults
-        FreeCAD = __import__("FreeCAD", globals(), locals())
-        femtools = __import__("femtools.ccxtools", globals(), locals())
-        vtkResults = __import__("feminout.importVTKResults", globals(), locals())
+        FreeCAD = importlib.import_module("FreeCAD")
     except (ImportError, ModuleNotFoundError):
-        logger.exception(f'"{freecad_path}" does not contain FreeCAD Python libraries')
+        logger.exception('"%s" does not contain FreeCAD Python libraries', freecad_path)
         raise
 
-    logger.debug(f"FreeCAD path added to sys.path: {freecad_path}")
+    logger.debug("FreeCAD path added to sys.path: %s", freecad_path)
+    _RESOLVED_PATH = freecad_path
+
+    return FreeCAD
 
-    return (FreeCAD, femtools, vtkResults)
+
+def registered_freecad_path() -> str:
+    """returns the path FreeCAD was imported from by register_freecad(), so
+    that other processes can skip searching for it
+
+    Returns:
+        str: path to the FreeCAD libraries, or "" if FreeCAD was not imported
+            by register_freecad()
+    """
+    return _RESOLVED_PATH
+
+
+def get_femtools():
+    """returns the FreeCAD femtools package, with femtools.ccxtools loaded.
+    Only imported the first time it is needed, as it is slow to load
+    """
+    global femtools
+    if femtools is None:
+        importlib.import_module("femtools.ccxtools")
+        femtools = importlib.import_module("femtools")
+    return femtools
+
+
+def get_vtk_results():
+    """returns the FreeCAD feminout package, with feminout.importVTKResults
+    loaded. Only imported the first time it is needed, as it pulls in VTK
+    """
+    global vtkResults
+    if vtkResults is None:
+        importlib.import_module("feminout.importVTKResults")
+        vtkResults = importlib.import_module("feminout")
+    return vtkResults
+
+
+def get_import_materials():
+    """returns the FreeCAD function reading the material cards. Only imported
+    the first time it is needed
+    """
+    global import_materials
+    if import_materials is None:
+        from materialtools.cardutils import import_materials  # type: ignore
+    return import_materials
@@ -0,0 +1,69 @@
+"""runs the test cases described in a params.json file, as written by a
+Dispatcher, and saves their results:
+
+    python -m FreecadParametricFEA.worker path/to/params.json
+
+The file describes either a single test case, or a batch of test cases in
+"cases" that share the same document, opened once
+"""
+import os
+import sys
+import json
+from typing import List, Optional
+
+from .freecadmodel import FreecadModel
+from .modelpool import solve_case
+from .dispatcher import save_case_result
+from .loghandler import logger
+
+
+def run_job(params_file: str) -> None:
+    """runs the test cases described in a params.json file
+
+    Args:
+        params_file (str): path to the params.json file
+    """
+    with open(params_file, encoding="utf8") as f:
+        params = json.load(f)
+
+    # the solver files stay in the job folder
+    solver_dir = os.path.join(os.path.dirname(os.path.abspath(params_file)), "solver")
+    os.makedirs(solver_dir, exist_ok=True)
+
+    model = FreecadModel(
+        document_path=params["document_path"],
+        freecad_path=params["freecad_path"],
+        working_dir=solver_dir,
+    )
+
+    # parameter setters are shared by all the test cases of a batch
+    setters: dict = {}
+    for case in params.get("cases", [params]):
+        (case_idx, result) = solve_case(
+            model,
+            setters,
+            (
+                case["case_idx"],
+                [tuple(p) for p in case["parameters"]],
+                case["solver_name"],
+                case["results_name"],
+                tuple(case["output_vars"]),
+                case["export_path"],
+                None,
+            ),
+        )
+
+        save_case_result(case["results_path"], result)
+        logger.info("Test case %s saved to %s", case_idx, case["results_path"])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        sys.exit("usage: python -m FreecadParametricFEA.worker params.json")
+
+    run_job(argv[0])
+
+
+if __name__ == "__main__":
+    main()
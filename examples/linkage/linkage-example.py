@@ -11,41 +11,47 @@ and max deflection.
 
 FREECAD_PATH = "C:/Program Files/FreeCAD 0.20/bin"
 
-# initialise the parametric FEA object
-fea = pfea(freecad_path=FREECAD_PATH)
-# set a path to the FreeCAD model
-script_path = path.dirname(path.realpath(__file__))
-fea.set_model(path.join(script_path, "linkage-example.fcstd"))
-# list the parameters to sweep
-fea.set_variables(
-    [
-        {
-            "object_name": "PocketSketch",
-            "constraint_name": "Spacing",
-            "constraint_values": np.linspace(15, 30, 5),
-        },
-    ]
-)
-
-fea.set_outputs(
-    [
-        {
-            "output_var": "vonMises",
-            "reduction_fun": np.max,
-        },
-        {
-            "output_var": "DisplacementLengths",
-            "reduction_fun": np.max,
-        },
-    ]
-)
-
-# setup the FEA
-fea.setup_fea(fea_results_name="CCX_Results", solver_name="SolverCcxTools")
-# results = fea.run_parametric(dry_run=True)
-results = fea.run_parametric(export_results=True)
-
-fea.plot_fea_results()
-
-# fea.save_fea_results(path.join(script_path, "linkage-results.csv"))
-print(results)
+# number of test cases to run in parallel
+N_JOBS = 4
+
+# the test cases run in separate processes, which import this script: the
+# sweep itself must only run when the script is executed
+if __name__ == "__main__":
+    # initialise the parametric FEA object
+    fea = pfea(freecad_path=FREECAD_PATH)
+    # set a path to the FreeCAD model
+    script_path = path.dirname(path.realpath(__file__))
+    fea.set_model(path.join(script_path, "linkage-example.fcstd"))
+    # list the parameters to sweep
+    fea.set_variables(
+        [
+            {
+                "object_name": "PocketSketch",
+                "constraint_name": "Spacing",
+                "constraint_values": np.linspace(15, 30, 5),
+            },
+        ]
+    )
+
+    fea.set_outputs(
+        [
+            {
+                "output_var": "vonMises",
+                "reduction_fun": np.max,
+            },
+            {
+                "output_var": "DisplacementLengths",
+                "reduction_fun": np.max,
+            },
+        ]
+    )
+
+    # setup the FEA
+    fea.setup_fea(fea_results_name="CCX_Results", solver_name="SolverCcxTools")
+    # results = fea.run_parametric(dry_run=True)
+    results = fea.run_parametric(export_results=True, n_jobs=N_JOBS)
+
+    fea.plot_fea_results()
+
+    # fea.save_fea_results(path.join(script_path, "linkage-results.csv"))
+    print(results)
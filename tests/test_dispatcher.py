@@ -0,0 +1,263 @@
+import os
+import sys
+import stat
+import pytest
+import numpy as np
+from FreecadParametricFEA import FreecadCmdDispatcher, SlurmDispatcher
+from FreecadParametricFEA.dispatcher import load_case_result, save_case_result
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+needs_sh = pytest.mark.skipif(
+    sys.platform == "win32", reason="the fake executables are shell scripts"
+)
+
+# stands in for a SLURM job: reads its params.json and saves the sum of the
+# parameter values as results. failing_case saves no results, or unreadable
+# ones if failure is "corrupt"
+FAKE_JOB = """
+import os, sys, json
+import numpy as np
+sys.path.insert(0, {package_dir!r})
+from FreecadParametricFEA.dispatcher import save_case_result
+
+(params_file, queue_file, failing_case, failure) = sys.argv[1:]
+with open(params_file, encoding="utf8") as f:
+    params = json.load(f)
+if params["case_idx"] == int(failing_case):
+    if failure == "corrupt":
+        with open(params["results_path"], "wb") as f:
+            f.write(b"PK truncated")
+else:
+    total = sum(value for (_, _, value) in params["parameters"])
+    save_case_result(
+        params["results_path"],
+        {{
+            "outputs": {{v: np.array([0.0, total]) for v in params["output_vars"]}},
+            "runtime": 1.5,
+            "msg": "",
+            "export_path": params["export_path"],
+        }},
+    )
+os.remove(queue_file)
+"""
+
+# stands in for freecadcmd: runs the command given with -c, with the FreeCAD
+# model and solver replaced. The solver saves the sum of the parameter values
+# as results, and crashes the process on failing_case
+FAKE_FREECADCMD = """#!{python}
+import sys
+import numpy as np
+sys.path.insert(0, {package_dir!r})
+from FreecadParametricFEA import worker
+
+failing_case = {failing_case}
+
+def open_model(**kwargs):
+    return None
+
+def solve_case(model, setters, job):
+    (case_idx, parameters, _, _, output_vars, export_path, _) = job
+    if case_idx == failing_case:
+        sys.exit(1)
+    # the setters are shared by all the test cases of a batch
+    setters[case_idx] = True
+    total = sum(value for (_, _, value) in parameters)
+    return (
+        case_idx,
+        {{
+            "outputs": {{v: np.array([0.0, total]) for v in output_vars}},
+            "runtime": float(len(setters)),
+            "msg": "",
+            "export_path": export_path,
+        }},
+    )
+
+worker.FreecadModel = open_model
+worker.solve_case = solve_case
+exec(sys.argv[sys.argv.index("-c") + 1])
+"""
+
+
+def _write_executable(filename, contents):
+    with open(filename, "w", encoding="utf8") as f:
+        f.write(contents)
+    os.chmod(filename, os.stat(filename).st_mode | stat.S_IEXEC)
+
+
+@pytest.fixture
+def fake_slurm(tmp_path, monkeypatch):
+    """puts fake sbatch, squeue and scancel executables on the PATH. The queue
+    is a folder with one file per running job"""
+    bin_dir = tmp_path / "bin"
+    queue_dir = tmp_path / "queue"
+    bin_dir.mkdir()
+    queue_dir.mkdir()
+    fake_job = tmp_path / "fake_job.py"
+    fake_job.write_text(FAKE_JOB.format(package_dir=PACKAGE_DIR), encoding="utf8")
+
+    # job.sh is the last argument, next to its params.json
+    _write_executable(
+        bin_dir / "sbatch",
+        "#!/bin/sh\n"
+        "for script; do :; done\n"
+        f'touch "{queue_dir}/$$"\n'
+        f'"{sys.executable}" "{fake_job}" "$(dirname "$script")/params.json" '
+        f'"{queue_dir}/$$" "$FAILING_CASE" "$FAILURE" &\n'
+        'echo "$$;cluster"\n',
+    )
+    _write_executable(bin_dir / "squeue", f'#!/bin/sh\nls "{queue_dir}"\n')
+    _write_executable(bin_dir / "scancel", "#!/bin/sh\n")
+
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.chdir(tmp_path)
+    document = tmp_path / "model.FCStd"
+    document.write_bytes(b"not really a FreeCAD file")
+    return str(document)
+
+
+@needs_sh
+@pytest.mark.parametrize(
+    ("failing_case", "failure"), [(-1, ""), (2, "missing"), (2, "corrupt")]
+)
+def test_slurm_dispatcher(fake_slurm, monkeypatch, failing_case, failure):
+    monkeypatch.setenv("FAILING_CASE", str(failing_case))
+    monkeypatch.setenv("FAILURE", failure)
+    param_tuples = [
+        [("Sketch", "A", float(a)), ("Sketch", "B", 10.0)] for a in range(4)
+    ]
+
+    dispatcher = SlurmDispatcher(
+        fake_slurm, freecad_path="/opt/freecad/lib", poll_interval=0.05
+    )
+    staging_dir = dispatcher.staging_dir
+    with dispatcher:
+        # the second sweep starts after the queue poller of the first stopped
+        for _ in range(2):
+            results = dispatcher.map_parameters(param_tuples, output_vars=["vonMises"])
+
+            for (case_idx, result) in enumerate(results):
+                if case_idx == failing_case:
+                    assert result["outputs"] == {}
+                    if failure == "missing":
+                        assert "ended without results" in result["msg"]
+                    else:
+                        assert "Could not read the results" in result["msg"]
+                else:
+                    assert result["msg"] == ""
+                    assert result["runtime"] == 1.5
+                    np.testing.assert_array_equal(
+                        result["outputs"]["vonMises"], [0.0, case_idx + 10.0]
+                    )
+
+    # the job files are only kept when a job failed
+    assert os.path.isdir(staging_dir) == (failing_case >= 0)
+
+
+@needs_sh
+def test_slurm_dispatcher_poll_error(fake_slurm, monkeypatch):
+    monkeypatch.setenv("FAILING_CASE", "-1")
+    monkeypatch.setenv("FAILURE", "")
+
+    def unreadable_queue(self):
+        raise RuntimeError("squeue crashed")
+
+    monkeypatch.setattr(SlurmDispatcher, "_queued_job_ids", unreadable_queue)
+
+    # the sweep fails rather than waiting forever for the jobs
+    with SlurmDispatcher(
+        fake_slurm, freecad_path="/opt/freecad/lib", poll_interval=0.05
+    ) as dispatcher:
+        with pytest.raises(RuntimeError, match="squeue crashed"):
+            dispatcher.map_parameters([[("Sketch", "A", 1.0)]])
+
+
+@needs_sh
+@pytest.mark.parametrize("failing_case", [-1, 2])
+def test_freecadcmd_dispatcher(tmp_path, failing_case):
+    freecadcmd = tmp_path / "freecadcmd"
+    _write_executable(
+        freecadcmd,
+        FAKE_FREECADCMD.format(
+            python=sys.executable, package_dir=PACKAGE_DIR, failing_case=failing_case
+        ),
+    )
+    document = tmp_path / "model.FCStd"
+    document.write_bytes(b"not really a FreeCAD file")
+    param_tuples = [
+        [("Sketch", "A", float(a)), ("Sketch", "B", 10.0)] for a in range(4)
+    ]
+
+    with FreecadCmdDispatcher(
+        str(document),
+        freecadcmd=str(freecadcmd),
+        staging_dir=str(tmp_path / "staging"),
+        poll_interval=0.05,
+    ) as dispatcher:
+        results = dispatcher.map_parameters(param_tuples, output_vars=["vonMises"])
+
+    # a staging folder given by the user is kept
+    assert len(os.listdir(tmp_path / "staging")) == 1
+
+    for (case_idx, result) in enumerate(results):
+        if failing_case >= 0 and case_idx >= failing_case:
+            # the process exited before running the remaining test cases
+            assert result["outputs"] == {}
+            assert result["msg"] == "freecadcmd exited with code 1 without results"
+        else:
+            assert result["msg"] == ""
+            # all the test cases ran in the same process and document
+            assert result["runtime"] == case_idx + 1
+            np.testing.assert_array_equal(
+                result["outputs"]["vonMises"], [0.0, case_idx + 10.0]
+            )
+
+
+def test_case_result_round_trip(tmp_path):
+    filename = str(tmp_path / "results.npz")
+    result = {
+        "outputs": {
+            "vonMises": np.linspace(0, 1, 5, dtype=np.float32),
+            "DisplacementVectors": np.ones((5, 3)),
+        },
+        "runtime": 2.5,
+        "msg": "FEA results are not present",
+        "export_path": str(tmp_path / "case_0.vtu"),
+    }
+
+    save_case_result(filename, result)
+    loaded = load_case_result(filename)
+
+    assert set(loaded) == set(result)
+    assert loaded["runtime"] == result["runtime"]
+    assert loaded["msg"] == result["msg"]
+    assert loaded["export_path"] == result["export_path"]
+    for (output_var, values) in result["outputs"].items():
+        np.testing.assert_array_equal(loaded["outputs"][output_var], values)
+        assert loaded["outputs"][output_var].dtype == values.dtype
+
+
+@needs_sh
+def test_freecadcmd_dispatcher_cleanup(tmp_path):
+    freecadcmd = tmp_path / "freecadcmd"
+    _write_executable(
+        freecadcmd,
+        FAKE_FREECADCMD.format(
+            python=sys.executable, package_dir=PACKAGE_DIR, failing_case=-1
+        ),
+    )
+    document = tmp_path / "model.FCStd"
+    document.write_bytes(b"not really a FreeCAD file")
+
+    with FreecadCmdDispatcher(
+        str(document), freecadcmd=str(freecadcmd), poll_interval=0.05
+    ) as dispatcher:
+        for _ in range(2):
+            results = dispatcher.map_parameters(
+                [[("Sketch", "A", 1.0)]], output_vars=["vonMises"]
+            )
+            assert results[0]["msg"] == ""
+        assert len(os.listdir(dispatcher.staging_dir)) == 2
+
+    # the default staging folder is removed, with all its batches
+    assert not os.path.exists(dispatcher.staging_dir)
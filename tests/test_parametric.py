@@ -1,7 +1,12 @@
 import glob
 import os
+import sys
+from functools import partial
 import pytest
-from FreecadParametricFEA import parametric
+from concurrent.futures import Future
+from FreecadParametricFEA import parametric, Dispatcher
+from FreecadParametricFEA.freecadmodel import reduce_results
+from FreecadParametricFEA.parametric import _group_outputs
 import pandas as pd
 import numpy as np
 import pickle
@@ -52,6 +57,46 @@ def test_single_parametric(initialise_freecad_object: parametric):
     assert results["amax(vonMises)"].max() < 2.1
 
 
+def test_parallel_parametric(initialise_freecad_object: parametric):
+    fea_obj = initialise_freecad_object
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": np.linspace(10, 30, 3),
+            },
+        ]
+    )
+
+    serial_results = fea_obj.run_parametric(quiet_mode=True).copy()
+    parallel_results = fea_obj.run_parametric(
+        quiet_mode=True, n_jobs=2, use_cache=False
+    )
+
+    assert len(parallel_results) == 3
+    assert np.allclose(
+        parallel_results["amax(vonMises)"], serial_results["amax(vonMises)"]
+    )
+
+
+def test_cached_parametric(initialise_freecad_object: parametric):
+    fea_obj = initialise_freecad_object
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": [10, 20, 10],
+            },
+        ]
+    )
+
+    results = fea_obj.run_parametric(quiet_mode=True)
+    assert results.loc[2, "FEA_Runtime"] == 0
+    assert results.loc[2, "amax(vonMises)"] == results.loc[0, "amax(vonMises)"]
+
+
 def test_parametric_material(initialise_freecad_object: parametric):
     fea_obj = initialise_freecad_object
 
@@ -200,6 +245,641 @@ def test_export_results(initialise_freecad_object: parametric, tmp_path):
         fea_obj.save_fea_results(results_filename=csv_file, mode="toml")
 
 
+def test_populate_test_dataframe():
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+
+    variables = [
+        {
+            "object_name": "Sketch",
+            "constraint_name": "HoleDiam",
+            "constraint_values": np.linspace(10, 30, 3),
+        },
+        {
+            "object_name": "MaterialSolid",
+            "constraint_name": "Material",
+            "constraint_values": ["Aluminium-Generic", "Steel-Generic"],
+        },
+        {
+            "object_name": "ShellThickness",
+            "constraint_name": "Thickness",
+            "constraint_values": np.linspace(10, 20, 2),
+        },
+    ]
+    df = fea_obj.populate_test_dataframe(variables, fea_obj.outputs)
+
+    # same test matrix (and order) as np.meshgrid
+    grid = np.meshgrid(*[v["constraint_values"] for v in variables])
+    assert len(df) == 12
+    for (variable, column) in zip(variables, grid):
+        heading = f"{variable['object_name']}.{variable['constraint_name']}"
+        assert (df[heading].to_numpy() == column.ravel()).all()
+
+
+def test_dry_run_without_model():
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": np.linspace(10, 30, 3),
+            },
+            {
+                "object_name": "MaterialSolid",
+                "constraint_name": "Material",
+                "constraint_values": ["Aluminium-Generic", "Steel-Generic"],
+            },
+        ]
+    )
+
+    results = fea_obj.run_parametric(dry_run=True)
+    assert len(results) == 6
+    assert (results["FEA_Runtime"] == 0).all()
+
+
+@pytest.mark.parametrize("sampling", ["lhs", "random"])
+def test_sampled_test_dataframe(sampling):
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+
+    variables = [
+        {
+            "object_name": "Sketch",
+            "constraint_name": "HoleDiam",
+            "constraint_values": np.linspace(10, 30, 3),
+        },
+        {
+            "object_name": "MaterialSolid",
+            "constraint_name": "Material",
+            "constraint_values": ["Aluminium-Generic", "Steel-Generic"],
+        },
+    ]
+    df = fea_obj.populate_test_dataframe(
+        variables, fea_obj.outputs, sampling=sampling, n_samples=20, seed=0
+    )
+
+    assert len(df) == 20
+    assert df["Sketch.HoleDiam"].between(10, 30).all()
+    assert df["MaterialSolid.Material"].isin(variables[1]["constraint_values"]).all()
+
+    # same seed, same test cases
+    df_again = fea_obj.populate_test_dataframe(
+        variables, fea_obj.outputs, sampling=sampling, n_samples=20, seed=0
+    )
+    pd.testing.assert_frame_equal(df, df_again)
+
+
+@pytest.mark.parametrize("sampling", ["lhs", "random"])
+def test_sampled_integer_parameters(sampling):
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    variables = [
+        {
+            "object_name": "Pattern",
+            "constraint_name": "Occurrences",
+            "constraint_values": [2, 5, 8],
+        },
+        {
+            "object_name": "Sketch",
+            "constraint_name": "HoleDiam",
+            "constraint_values": [10.0, 30.0],
+        },
+    ]
+
+    df = fea_obj.populate_test_dataframe(
+        variables, fea_obj.outputs, sampling=sampling, n_samples=70, seed=0
+    )
+
+    occurrences = df["Pattern.Occurrences"]
+    assert pd.api.types.is_integer_dtype(occurrences)
+    assert set(occurrences) == set(range(2, 9))
+    assert pd.api.types.is_float_dtype(df["Sketch.HoleDiam"])
+    if sampling == "lhs":
+        # each integer gets the same share of the samples
+        assert (occurrences.value_counts() == 10).all()
+
+
+@pytest.mark.parametrize("n_samples", [0, -5, None, 2.5, True])
+def test_sampled_test_dataframe_bad_n_samples(n_samples):
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    variables = [
+        {
+            "object_name": "Sketch",
+            "constraint_name": "HoleDiam",
+            "constraint_values": np.linspace(10, 30, 3),
+        },
+    ]
+
+    with pytest.raises(ValueError):
+        fea_obj.populate_test_dataframe(
+            variables, fea_obj.outputs, sampling="lhs", n_samples=n_samples
+        )
+
+    with pytest.raises(NotImplementedError):
+        fea_obj.populate_test_dataframe(
+            variables, fea_obj.outputs, sampling="sobol", n_samples=n_samples
+        )
+
+
+@pytest.mark.parametrize("n_values", [1, 2, 1000, 1001])
+@pytest.mark.parametrize(
+    "reduction_funs",
+    [
+        [np.max],
+        [np.min, np.max],
+        [np.min, np.median, np.max, partial(np.percentile, q=90)],
+        [np.amin, np.amax, np.median, partial(np.percentile, q=5)],
+    ],
+)
+def test_fused_reductions(n_values, reduction_funs):
+    rng = np.random.default_rng(0)
+    fields = {
+        "vonMises": list(rng.random(n_values) * 100),
+        "DisplacementLengths": list(rng.random(n_values) / 3),
+        "DisplacementVectors": [list(v) for v in rng.random((n_values, 3))],
+    }
+    output_specs = [
+        (output_var, reduction_fun, f"{output_var}_{i}")
+        for output_var in fields
+        for (i, reduction_fun) in enumerate(reduction_funs)
+    ]
+
+    output_groups = _group_outputs(output_specs)
+    # order statistics are only fused when there are more than one
+    n_fused = sum(len(quantiles) for (_, quantiles, _) in output_groups)
+    n_known = sum(
+        f in (np.min, np.amin, np.median, np.max, np.amax) for f in reduction_funs
+    )
+    assert n_fused == (len(fields) * n_known if n_known > 1 else 0)
+
+    reduced = reduce_results(fields.get, output_groups)
+    assert set(reduced) == {heading for (_, _, heading) in output_specs}
+    for (output_var, reduction_fun, heading) in output_specs:
+        # exactly the same values as the functions on their own
+        assert reduced[heading] == reduction_fun(np.asarray(fields[output_var]))
+
+
+def test_fused_reductions_nan():
+    fields = {"vonMises": [1.0, np.nan, 3.0, 2.0]}
+    output_specs = [
+        ("vonMises", np.min, "min"),
+        ("vonMises", np.median, "median"),
+        ("vonMises", np.max, "max"),
+    ]
+
+    reduced = reduce_results(fields.get, _group_outputs(output_specs))
+
+    assert all(np.isnan(value) for value in reduced.values())
+
+
+def test_reductions_full_precision():
+    fields = {"vonMises": [2.0123456789, 2.0123456789 + 1e-12, 1.5]}
+    output_specs = [
+        ("vonMises", np.min, "min"),
+        ("vonMises", np.max, "max"),
+        ("vonMises", lambda v: v[1] - v[0], "difference"),
+    ]
+
+    reduced = reduce_results(fields.get, _group_outputs(output_specs))
+
+    # all lost in single precision
+    assert reduced["difference"] == fields["vonMises"][1] - fields["vonMises"][0]
+    assert reduced["min"] == 1.5
+    assert reduced["max"] == fields["vonMises"][1]
+
+
+def test_duplicate_test_cases():
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                # the string "10" is a different value than the number 10
+                "constraint_values": np.array([10, "10", 20, 10], dtype=object),
+            },
+            {
+                "object_name": "MaterialSolid",
+                "constraint_name": "Material",
+                "constraint_values": ["Aluminium-Generic", "Steel-Generic"] * 2,
+            },
+        ]
+    )
+    fea_obj.results_dataframe = fea_obj.populate_test_dataframe(
+        fea_obj.variables, fea_obj.outputs
+    )
+    n_rows = len(fea_obj.results_dataframe)
+
+    # first row with the same values and value types as each row
+    rows = [
+        tuple((type(v), v) for v in row)
+        for row in fea_obj.results_dataframe[fea_obj._param_headings].itertuples(
+            index=False
+        )
+    ]
+    expected_source_rows = [rows.index(row) for row in rows]
+
+    source_rows = fea_obj._source_rows()
+    assert source_rows.tolist() == expected_source_rows
+    assert len(set(expected_source_rows)) == 6
+
+    # only the first test case of each set of duplicates has results
+    is_source = source_rows == np.arange(n_rows)
+    results = {
+        heading: np.where(is_source, np.arange(n_rows) + 1.0, 0.0)
+        for heading in fea_obj._output_headings + ["FEA_Runtime"]
+    }
+    results["Msg"] = np.array(
+        [f"case {i}" if is_source[i] else "" for i in range(n_rows)], dtype=object
+    )
+
+    fea_obj._copy_duplicate_cases(
+        results, source_rows, export_results=False, output_folder=""
+    )
+
+    for (row_idx, source_idx) in enumerate(expected_source_rows):
+        for heading in fea_obj._output_headings:
+            assert results[heading][row_idx] == source_idx + 1
+        assert results["Msg"][row_idx] == f"case {source_idx}"
+        assert results["FEA_Runtime"][row_idx] == (
+            source_idx + 1 if row_idx == source_idx else 0
+        )
+
+
+class _StubResults:
+    def __init__(self, values):
+        self.values = values
+
+    def getPropertyByName(self, name):
+        return self.values
+
+
+class _StubModel:
+    """stands in for a FreecadModel, solving each test case to the sum of its
+    parameter values. Parameters can't be set to 0"""
+
+    solver_name = ""
+    fea_results_name = ""
+
+    def __init__(self, filename=""):
+        self.filename = filename
+        self.params = {}
+        self.solved = []
+        self._param_state = {}
+
+    def parameter_setter(self, object_name, constraint_name):
+        def set_parameter(value):
+            if isinstance(value, float) and value == 0:
+                raise ValueError("invalid datum")
+            self.params[constraint_name] = value
+
+        return set_parameter
+
+    def commit_parameters(self):
+        pass
+
+    def run_fea(self):
+        self.solved.append(dict(self.params))
+        values = [v for v in self.params.values() if not isinstance(v, str)]
+        return _StubResults([0.0, sum(values)])
+
+
+def test_cache_skips_failed_cases(tmp_path):
+    document = tmp_path / "model.FCStd"
+    document.write_bytes(b"not really a FreeCAD file")
+
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel(str(document))
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "A",
+                "constraint_values": [1.0, 0.0, 2.0],
+            },
+        ]
+    )
+    fea_obj.set_outputs([{"output_var": "vonMises", "reduction_fun": np.max}])
+
+    first = fea_obj.run_parametric(quiet_mode=True, use_cache=True).copy()
+    second = fea_obj.run_parametric(quiet_mode=True, use_cache=True)
+
+    assert first["Msg"].tolist() == ["", "invalid datum", ""]
+    pd.testing.assert_series_equal(second["Msg"], first["Msg"])
+    # only the failed test case is solved again
+    assert len(fea_obj.freecad_document.solved) == 4
+    assert second["FEA_Runtime"].tolist()[0] == 0.0
+    assert second["FEA_Runtime"].tolist()[1] > 0.0
+
+
+def test_cache_reduction_functions(tmp_path):
+    document = tmp_path / "model.FCStd"
+    document.write_bytes(b"not really a FreeCAD file")
+
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel(str(document))
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "A",
+                "constraint_values": [1.0, 2.0],
+            },
+        ]
+    )
+    solved = fea_obj.freecad_document.solved
+
+    def run(reduction_fun, use_cache=True):
+        fea_obj.set_outputs(
+            [
+                {
+                    "output_var": "vonMises",
+                    "reduction_fun": reduction_fun,
+                    "column_label": "stress",
+                }
+            ]
+        )
+        results = fea_obj.run_parametric(quiet_mode=True, use_cache=use_cache)
+        return results["stress(vonMises)"].tolist()
+
+    # off by default
+    assert run(np.max, use_cache=False) == [1.0, 2.0]
+    assert fea_obj.fea_cache == {}
+
+    assert run(np.max) == [1.0, 2.0]
+    assert run(np.max) == [1.0, 2.0]
+    assert len(solved) == 4
+
+    # same heading, different function
+    assert run(np.min) == [0.0, 0.0]
+    assert run(partial(np.percentile, q=50)) == [0.5, 1.0]
+    assert run(partial(np.percentile, q=100)) == [1.0, 2.0]
+    assert len(solved) == 10
+    assert run(partial(np.percentile, q=50)) == [0.5, 1.0]
+    assert len(solved) == 10
+
+    # lambdas can't be told apart, and are never cached
+    assert run(lambda v: np.max(v)) == [1.0, 2.0]
+    assert run(lambda v: np.min(v)) == [0.0, 0.0]
+    assert len(solved) == 14
+
+
+def test_run_order():
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel()
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "A",
+                "constraint_values": [1.0, 2.0, 3.0],
+            },
+            {
+                "object_name": "Sketch",
+                "constraint_name": "B",
+                "constraint_values": [30.0, 10.0, 20.0],
+                "sort_priority": 2,
+            },
+            {
+                "object_name": "Sketch",
+                "constraint_name": "C",
+                "constraint_values": [100.0, 200.0],
+                "sort_priority": 1,
+            },
+        ]
+    )
+    fea_obj.set_outputs([{"output_var": "vonMises", "reduction_fun": np.max}])
+    fea_obj.results_dataframe = fea_obj.populate_test_dataframe(
+        fea_obj.variables, fea_obj.outputs
+    )
+    param_columns = fea_obj._param_columns()
+
+    # B changes least often, then C, the rest keep their order
+    run_order = fea_obj._run_order(param_columns)
+    assert sorted(run_order.tolist()) == list(range(18))
+    b_values = param_columns[1][run_order]
+    assert (np.diff(pd.factorize(b_values)[0]) >= 0).all()
+    assert len(np.flatnonzero(b_values[1:] != b_values[:-1])) == 2
+    c_values = param_columns[2][run_order]
+    assert len(np.flatnonzero(c_values[1:] != c_values[:-1])) == 5
+    for run_idx in range(0, 18, 3):
+        rows = run_order[run_idx : run_idx + 3]
+        assert (np.diff(rows) > 0).all()
+
+    test_matrix = fea_obj.results_dataframe[fea_obj._param_headings]
+    results = fea_obj.run_parametric(quiet_mode=True, use_cache=False)
+
+    # solved in the run order, stored by original row
+    solved = fea_obj.freecad_document.solved
+    assert [case["B"] for case in solved] == b_values.tolist()
+    expected = results["Sketch.A"] + results["Sketch.B"] + results["Sketch.C"]
+    assert results["max(vonMises)"].tolist() == expected.tolist()
+    pd.testing.assert_frame_equal(results[fea_obj._param_headings], test_matrix)
+
+
+@pytest.mark.parametrize("extension", ["csv", "arrow"])
+def test_stream_to(tmp_path, extension):
+    if extension == "arrow":
+        pa = pytest.importorskip("pyarrow")
+
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel()
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": np.linspace(10, 30, 3),
+                "sort_priority": 1,
+            },
+            {
+                "object_name": "MaterialSolid",
+                "constraint_name": "Material",
+                "constraint_values": ["Aluminium-Generic", "Stahl-Geglüht"],
+            },
+        ]
+    )
+    fea_obj.set_outputs([{"output_var": "vonMises", "reduction_fun": np.max}])
+    stream_file = str(tmp_path / f"results.{extension}")
+
+    results = fea_obj.run_parametric(
+        quiet_mode=True, use_cache=False, stream_to=stream_file
+    )
+
+    if extension == "csv":
+        streamed = pd.read_csv(
+            stream_file, index_col=0, encoding="utf-8", keep_default_na=False
+        )
+    else:
+        with pa.ipc.open_stream(stream_file) as reader:
+            streamed = reader.read_pandas().set_index("test_case")
+        streamed.index.name = None
+
+    # the test cases are streamed in the order they are run
+    assert len(streamed) == len(results)
+    assert not streamed.index.is_monotonic_increasing
+    streamed = streamed.sort_index()
+
+    assert list(streamed.columns) == list(results.columns)
+    for heading in results.columns:
+        if heading == "FEA_Runtime":
+            np.testing.assert_allclose(streamed[heading], results[heading])
+        else:
+            assert streamed[heading].tolist() == results[heading].tolist()
+
+
+@pytest.mark.parametrize(
+    ("mode", "engine"), [("parquet", "pandas"), ("csv", "pyarrow")]
+)
+def test_save_results_without_model(tmp_path, mode, engine):
+    pytest.importorskip("pyarrow")
+
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": np.linspace(10, 30, 3),
+            },
+            {
+                "object_name": "MaterialSolid",
+                "constraint_name": "Material",
+                "constraint_values": ["Aluminium-Generic", "Steel-Generic"],
+            },
+        ]
+    )
+    df = fea_obj.populate_test_dataframe(fea_obj.variables, fea_obj.outputs)
+    df["max(vonMises)"] = np.linspace(0.5, 3.0, len(df))
+    df.loc[2, "Msg"] = "FEA results are not present, check the solver"
+    fea_obj.results_dataframe = df
+
+    results_filename = str(tmp_path / f"results.{mode}")
+    fea_obj.save_fea_results(results_filename, mode=mode, engine=engine)
+
+    if mode == "parquet":
+        pd.testing.assert_frame_equal(pd.read_parquet(results_filename), df)
+    else:
+        # reads back the same as the csv written by pandas, except for whole
+        # floats, which pyarrow writes without a decimal point
+        pandas_filename = str(tmp_path / "results_pandas.csv")
+        fea_obj.save_fea_results(pandas_filename, mode="csv")
+        saved = pd.read_csv(results_filename, index_col=0)
+        pd.testing.assert_frame_equal(
+            saved, pd.read_csv(pandas_filename, index_col=0), check_dtype=False
+        )
+        assert (
+            saved["MaterialSolid.Material"].tolist()
+            == df["MaterialSolid.Material"].tolist()
+        )
+        assert saved["max(vonMises)"].tolist() == df["max(vonMises)"].tolist()
+
+
+class _RecordingDispatcher(Dispatcher):
+    """solves each test case to the sum of its parameter values, recording the
+    output groups it was asked to reduce"""
+
+    def __init__(self):
+        self.output_groups = []
+        self.parameters = []
+
+    def submit(self, job):
+        (case_idx, parameters, _, _, output_vars, export_path, output_groups) = job
+        self.output_groups.append(output_groups)
+        self.parameters.append(parameters)
+        total = sum(value for (_, _, value) in parameters)
+        future = Future()
+        future.set_result(
+            (
+                case_idx,
+                {
+                    "outputs": {v: np.array([0.0, total]) for v in output_vars},
+                    "runtime": 1.0,
+                    "msg": "",
+                    "export_path": export_path,
+                },
+            )
+        )
+        return future
+
+
+def _value_range(values):
+    return np.max(values) - np.min(values)
+
+
+@pytest.mark.parametrize("module", [__name__, "__main__"])
+def test_reduction_functions_from_main(monkeypatch, module):
+    # functions defined in a notebook pickle by reference to __main__, which
+    # the workers can't import
+    monkeypatch.setattr(_value_range, "__module__", module)
+    monkeypatch.setattr(
+        sys.modules["__main__"], "_value_range", _value_range, raising=False
+    )
+
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel()
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "HoleDiam",
+                "constraint_values": np.linspace(10, 30, 3),
+            },
+        ]
+    )
+    fea_obj.set_outputs(
+        [
+            {"output_var": "vonMises", "reduction_fun": np.max},
+            {
+                "output_var": "vonMises",
+                "reduction_fun": partial(_value_range),
+                "column_label": "range",
+            },
+        ]
+    )
+    dispatcher = _RecordingDispatcher()
+
+    results = fea_obj.run_parametric(
+        quiet_mode=True, use_cache=False, dispatcher=dispatcher
+    )
+
+    assert len(dispatcher.output_groups) == 3
+    if module == "__main__":
+        assert all(groups is None for groups in dispatcher.output_groups)
+    else:
+        assert all(groups is not None for groups in dispatcher.output_groups)
+    np.testing.assert_array_equal(results["max(vonMises)"], [10.0, 20.0, 30.0])
+    np.testing.assert_array_equal(results["range(vonMises)"], [10.0, 20.0, 30.0])
+
+
+def test_fixed_parameters_sent_as_applied():
+    fea_obj = parametric(freecad_path=FREECAD_PATH)
+    fea_obj.freecad_document = _StubModel()
+    # applied by an earlier sweep
+    fea_obj.freecad_document._param_state.update(
+        {("Pad", "Reversed"): True, ("Mesh", "Count"): 3, ("Sketch", "A"): 5.0}
+    )
+    fea_obj.set_variables(
+        [
+            {
+                "object_name": "Sketch",
+                "constraint_name": "A",
+                "constraint_values": [1.0, 2.0],
+            },
+        ]
+    )
+    dispatcher = _RecordingDispatcher()
+
+    fea_obj.run_parametric(quiet_mode=True, dispatcher=dispatcher)
+
+    for (case_idx, parameters) in enumerate(dispatcher.parameters):
+        assert parameters == [
+            ("Mesh", "Count", 3),
+            ("Pad", "Reversed", True),
+            ("Sketch", "A", case_idx + 1.0),
+        ]
+        assert type(parameters[0][2]) is int
+        assert type(parameters[1][2]) is bool
+
+
 # TODO:
 # - test dry run is full of zeros
 